@@ -16,12 +16,17 @@ from torch import nn
 import torch
 import torch.optim as optim
 import json
+import os
 import pickle
+from types import MappingProxyType
 from typing import Dict, List
 import threading
-import random
+import heapq
 from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+import subprocess
 import sys # For ContextManager
+from cfsScheduler import Node, RedBlackTree, KERNEL_ACCOUNTING
 # import math # Not needed as QuantumScheduler is removed
 
 # Placeholder classes for context handlers and networkx
@@ -39,14 +44,33 @@ class LinuxContextHandler:
 
 class AITaskScheduler:
     def __init__(self):
-        self.monitor = SystemMonitor()
-        self.learner = ReinforcementLearner()
-        self.task_queue = TaskQueue()
+        self.config = self.load_config()
+        # Snapshots may be reused for two sampling intervals before a caller resamples
+        self.monitor = SystemMonitor(max_age=2 * self.config.get('metrics_interval', 1.0),
+                                     history_size=self.config.get('history_size', 1000))
+        self.learner = ReinforcementLearner(prioritized=self.config.get('prioritized_replay', False))
+        self.task_queue = TaskQueue(fair_share=self.config.get('fair_share', False))
         self.models = {
             'time_predictor': TimePredictor(),
             'priority_adjuster': PriorityAdjuster()
         }
-        self.config = self.load_config()
+        # Inference copies of the models; refresh after loading or training weights
+        self.snapshots = {
+            'time_predictor': MLPSnapshot(self.models['time_predictor'].net)
+        }
+
+    def refresh_snapshots(self):
+        """Copy current model weights into the inference snapshots."""
+        self.snapshots['time_predictor'].refresh(self.models['time_predictor'].net)
+        self.learner.policy.refresh(self.learner.model)
+
+    def load_model(self, name, path):
+        """Load saved weights into self.models[name] (or the learner for 'learner') and refresh
+        the inference snapshots so decisions use them."""
+        model = self.learner.model if name == 'learner' else self.models[name]
+        PersistenceManager.load_model(model, path)
+        self.refresh_snapshots()
+        return model
 
     def load_config(self):
         try:
@@ -56,30 +80,247 @@ class AITaskScheduler:
             return {
                 'learning_rate': 0.001,
                 'exploration_rate': 0.3,
-                'history_size': 1000
+                'history_size': 1000,
+                'fair_share': False,
+                'decision_batch_size': 1,
+                'metrics_interval': 1.0,
+                'prioritized_replay': False,
+                'resource_interval': 0.5
             }
 
-class SystemMonitor:
-    def __init__(self):
-        self.metrics_history = {
-            'cpu': deque(maxlen=1000),
-            'memory': deque(maxlen=1000),
-            'disk': deque(maxlen=1000),
-            'network': deque(maxlen=1000),
+class MetricsRing:
+    """Fixed-size NumPy history of timestamped metric samples.
+
+    Rows are (timestamp, *columns). Each sample is written twice, at i and
+    i + capacity, so the most recent n rows are always one contiguous slice and
+    window queries return views without copying. append() is O(1); queries
+    select a window either as the last n samples or the last `seconds` of
+    timestamps (binary search) and reduce it with vectorised NumPy. Views
+    returned by last() and since() are overwritten as the buffer wraps.
+    """
+    def __init__(self, columns=('cpu', 'memory', 'disk', 'network'), capacity=1000):
+        self.columns = {name: i + 1 for i, name in enumerate(columns)}
+        self.capacity = capacity
+        self.data = np.zeros((2 * capacity, len(columns) + 1))
+        self.head = 0 # Next slot to write
+        self.count = 0
+        self.lock = threading.Lock() # Serializes writers; readers take views without it
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, *values):
+        with self.lock:
+            row = (timestamp,) + values
+            self.data[self.head] = row
+            self.data[self.head + self.capacity] = row
+            self.head = (self.head + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+
+    def last(self, n=None):
+        """The most recent n rows (all if None), oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.capacity
+        return self.data[end - n:end]
+
+    def since(self, seconds, now=None):
+        """Rows with timestamps in the last `seconds` (relative to the newest sample by default)."""
+        rows = self.last()
+        if not len(rows):
+            return rows
+        if now is None:
+            now = rows[-1, 0]
+        return rows[np.searchsorted(rows[:, 0], now - seconds):]
+
+    def window(self, column, seconds=None, n=None):
+        rows = self.last(n) if seconds is None else self.since(seconds)
+        return rows[:, self.columns[column]]
+
+    def mean(self, column, seconds=None, n=None):
+        values = self.window(column, seconds, n)
+        return float(values.mean()) if len(values) else 0.0
+
+    def min(self, column, seconds=None, n=None):
+        values = self.window(column, seconds, n)
+        return float(values.min()) if len(values) else 0.0
+
+    def max(self, column, seconds=None, n=None):
+        values = self.window(column, seconds, n)
+        return float(values.max()) if len(values) else 0.0
+
+    def percentile(self, column, q, seconds=None, n=None):
+        values = self.window(column, seconds, n)
+        return float(np.percentile(values, q)) if len(values) else 0.0
+
+    def ewma(self, column, alpha=0.1, seconds=None, n=None):
+        """Exponentially weighted mean over the window, newest sample weighted highest."""
+        values = self.window(column, seconds, n)
+        if not len(values):
+            return 0.0
+        weights = (1 - alpha) ** np.arange(len(values) - 1, -1, -1)
+        return float(values @ weights / weights.sum())
+
+    def trend(self, column, seconds=None, n=None):
+        """Least-squares slope of the column over the window, in units per second."""
+        rows = self.last(n) if seconds is None else self.since(seconds)
+        if len(rows) < 2:
+            return 0.0
+        t = rows[:, 0] - rows[:, 0].mean()
+        denominator = t @ t
+        return float(t @ rows[:, self.columns[column]] / denominator) if denominator else 0.0
+
+    def rolling_mean(self, column, width, seconds=None, n=None):
+        """Mean of each run of `width` consecutive samples in the window."""
+        values = self.window(column, seconds, n)
+        if len(values) < width:
+            return np.empty(0)
+        sums = np.cumsum(values)
+        sums[width:] = sums[width:] - sums[:-width]
+        return sums[width - 1:] / width
+
+class TaskHistoryStore:
+    """Bounded columnar history of completed tasks.
+
+    Each result fills one slot of preallocated arrays (duration, predicted
+    duration, success, CPU and memory at completion, end time, task type id),
+    overwriting the oldest once `capacity` results are stored, so append and
+    eviction are O(1). Queries over the last N results or one task type are
+    vectorised. Result number s (counting from 0) lives in slot s % capacity;
+    the original dicts are kept alongside for failure analysis.
+    """
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.duration = np.zeros(capacity)
+        self.predicted = np.zeros(capacity)
+        self.success = np.zeros(capacity, dtype=bool)
+        self.cpu = np.zeros(capacity)
+        self.memory = np.zeros(capacity)
+        self.end_time = np.zeros(capacity)
+        self.type_id = np.zeros(capacity, dtype=np.int32)
+        self.records = np.empty(capacity, dtype=object)
+        self.types = {} # Task type (its 'type', else its name) -> id
+        self.type_names = []
+        self.total = 0 # Results appended so far
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock'] # Locks cannot be pickled; PersistenceManager.save_history pickles the store
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def type_of(self, name):
+        type_id = self.types.get(name)
+        if type_id is None:
+            type_id = self.types[name] = len(self.type_names)
+            self.type_names.append(name)
+        return type_id
+
+    def append(self, result: Dict):
+        task = result['task']
+        metrics = result.get('metrics_at_completion') or result.get('metrics', {})
+        with self.lock:
+            slot = self.total % self.capacity
+            self.duration[slot] = result.get('actual_duration', 0)
+            self.predicted[slot] = result.get('predicted_duration', 0)
+            self.success[slot] = result.get('success', False)
+            self.cpu[slot] = metrics.get('cpu', 0)
+            self.memory[slot] = metrics.get('memory', 0)
+            self.end_time[slot] = result.get('end_time', 0)
+            self.type_id[slot] = self.type_of(task.get('type', task['name']))
+            self.records[slot] = result
+            self.total += 1
+
+    def _recent(self, column, last=None):
+        """The last `last` values of a column, oldest first; a view unless the window wraps."""
+        n = len(self) if last is None else min(last, len(self))
+        end = self.total % self.capacity
+        start = end - n
+        if start >= 0:
+            return column[start:end]
+        if end == 0:
+            return column[start:]
+        return np.concatenate((column[start:], column[:end]))
+
+    def _type_mask(self, last, task_type):
+        return self._recent(self.type_id, last) == self.types.get(task_type, -1)
+
+    def success_rate(self, last=None, task_type=None):
+        success = self._recent(self.success, last)
+        if task_type is not None:
+            success = success[self._type_mask(last, task_type)]
+        return np.count_nonzero(success) / len(success) if len(success) else 0.0
+
+    def mean_duration(self, last=None, task_type=None, successful_only=True):
+        duration = self._recent(self.duration, last)
+        if not successful_only and task_type is None:
+            return float(duration.sum() / len(duration)) if len(duration) else 0.0
+        mask = self._recent(self.success, last) if successful_only else self._type_mask(last, task_type)
+        if successful_only and task_type is not None:
+            mask = mask & self._type_mask(last, task_type)
+        count = np.count_nonzero(mask)
+        return float(duration[mask].sum() / count) if count else 0.0
+
+    def mean_prediction_error(self, last=None, task_type=None):
+        error = np.abs(self._recent(self.duration, last) - self._recent(self.predicted, last))
+        if task_type is not None:
+            error = error[self._type_mask(last, task_type)]
+        return float(error.sum() / len(error)) if len(error) else 0.0
+
+    def stats_by_type(self, last=None):
+        """{task type: (count, success rate, mean successful duration)} over the last results."""
+        types = self._recent(self.type_id, last)
+        success = self._recent(self.success, last)
+        size = len(self.type_names)
+        counts = np.bincount(types, minlength=size)
+        successes = np.bincount(types, weights=success, minlength=size)
+        durations = np.bincount(types, weights=self._recent(self.duration, last) * success, minlength=size)
+        return {
+            name: (int(counts[i]), float(successes[i] / counts[i]),
+                   float(durations[i] / successes[i]) if successes[i] else 0.0)
+            for i, name in enumerate(self.type_names) if counts[i]
         }
-        self.task_history = []
+
+    def failures_since(self, cursor):
+        """Failed results numbered `cursor` onwards that are still stored, and the next cursor."""
+        total = self.total
+        start = max(cursor, total - self.capacity)
+        slots = np.arange(start, total) % self.capacity
+        return list(self.records[slots[~self.success[slots]]]), total
+
+class SystemMonitor:
+    """Samples system metrics and publishes the latest sample as a read-only snapshot.
+
+    collect_metrics() samples now; get_metrics() returns the published snapshot
+    without any syscalls unless it is older than max_age seconds. Run
+    continuous_monitoring() in a background thread to keep the snapshot fresh.
+    Snapshots are replaced, never mutated, so readers need no lock.
+    """
+    def __init__(self, max_age=2.0, history_size=1000):
+        self.metrics_history = MetricsRing(('cpu', 'memory', 'disk', 'network'), history_size)
+        self.task_history = TaskHistoryStore(history_size)
         self.resource_thresholds = {
             'cpu': 80,  # %
             'memory': 90 # %
         }
         self._running = False # Control flag for the monitoring loop
+        self.max_age = max_age
+        self.latest = None # Latest published snapshot
 
     def collect_metrics(self):
-        """Collects current system metrics."""
+        """Collects current system metrics and publishes them as the latest snapshot."""
         cpu_percent = psutil.cpu_percent(interval=None) # No interval here, as we control the loop
         memory_percent = psutil.virtual_memory().percent
         disk_busy_time = psutil.disk_io_counters().busy_time
-        net_bytes_sent_recv = psutil.net_io_counters().bytes_sent + psutil.net_io_counters().bytes_recv
+        net_io = psutil.net_io_counters()
+        net_bytes_sent_recv = net_io.bytes_sent + net_io.bytes_recv
         timestamp = time.time()
 
         metrics = {
@@ -91,21 +332,27 @@ class SystemMonitor:
         }
 
         # Append to history
-        self.metrics_history['cpu'].append(cpu_percent)
-        self.metrics_history['memory'].append(memory_percent)
-        self.metrics_history['disk'].append(disk_busy_time)
-        self.metrics_history['network'].append(net_bytes_sent_recv)
+        self.metrics_history.append(timestamp, cpu_percent, memory_percent, disk_busy_time, net_bytes_sent_recv)
 
-        return metrics
+        snapshot = MappingProxyType(metrics)
+        self.latest = snapshot
+        return snapshot
+
+    def get_metrics(self, max_age=None):
+        """Latest snapshot, resampled only if older than max_age seconds (default self.max_age)."""
+        snapshot = self.latest
+        if max_age is None:
+            max_age = self.max_age
+        if snapshot is None or time.time() - snapshot['timestamp'] > max_age:
+            return self.collect_metrics()
+        return snapshot
 
     def log_task(self, task: Dict):
         """Log task execution details"""
         # Ensure 'metrics' key exists or add it
         if 'metrics' not in task:
-            task['metrics'] = self.collect_metrics() # Collect metrics at the time of logging if not already present
+            task['metrics'] = dict(self.get_metrics()) # Latest metrics at the time of logging if not already present
         self.task_history.append(task)
-        if len(self.task_history) > 1000:
-            self.task_history.pop(0)
 
     def continuous_monitoring(self, interval=1):
         """
@@ -135,6 +382,50 @@ class TimePredictor(nn.Module):
     def forward(self, x):
         return self.net(x)
 
+class MLPSnapshot:
+    """Frozen NumPy copy of an nn.Sequential of Linear and ReLU layers for fast inference.
+
+    Small MLPs spend far longer in PyTorch dispatch than in the math, so decisions
+    are evaluated on a float32 copy of the weights instead. Call refresh() to pick
+    up new training weights. Single-row calls reuse preallocated buffers and
+    return one of them, so results stay valid only until the next call and a
+    snapshot should be called from one thread.
+    """
+    def __init__(self, model):
+        self.refresh(model)
+
+    def refresh(self, model):
+        layers = []
+        for module in model:
+            if isinstance(module, nn.Linear):
+                weight = module.weight.detach().cpu().numpy().T.astype(np.float32, order='C')
+                bias = module.bias.detach().cpu().numpy().astype(np.float32)
+                layers.append([weight, bias, False])
+            elif isinstance(module, nn.ReLU) and layers:
+                layers[-1][2] = True
+            else:
+                raise ValueError(f"Cannot snapshot layer {module!r}")
+        self.layers = [tuple(layer) for layer in layers]
+        self.buffers = [np.empty(weight.shape[1], dtype=np.float32) for weight, _, _ in self.layers]
+
+    def __call__(self, x):
+        """Evaluate one row (1-D) or a batch (2-D) of inputs."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            for (weight, bias, relu), out in zip(self.layers, self.buffers):
+                np.dot(x, weight, out=out)
+                out += bias
+                if relu:
+                    np.maximum(out, 0, out=out)
+                x = out
+            return x
+        for weight, bias, relu in self.layers:
+            x = x @ weight
+            x += bias
+            if relu:
+                np.maximum(x, 0, out=x)
+        return x
+
 class PriorityAdjuster:
     def __init__(self):
         self.cluster_model = KMeans(n_clusters=5, n_init=10)
@@ -176,12 +467,177 @@ class PriorityAdjuster:
         # Adjust mapping as needed based on your cluster interpretation
         return 100 - (np.argmin(distances) * (100 / self.cluster_model.n_clusters))
 
+class ReplayBuffer:
+    """Fixed-capacity experience replay backed by preallocated arrays.
+
+    Transitions fill one slot each of the state, action, reward, next-state and
+    done columns, overwriting the oldest once `capacity` are stored, so insert
+    is O(1). sample() draws distinct slots with an index array and gathers each
+    column straight into batch buffers that the returned tensors share memory
+    with, so a replay step allocates nothing; the tensors are overwritten by
+    the next sample() call.
+    """
+    def __init__(self, capacity=10000, state_size=8, seed=None):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.done = np.zeros(capacity, dtype=bool) # No next state (terminal transition)
+        self.total = 0 # Transitions appended so far
+        self.rng = np.random.default_rng(seed)
+        self.batch = None # Column buffers and tensors of the last batch size sampled
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, state, action, reward, next_state):
+        with self.lock:
+            return self._write(state, action, reward, next_state)
+
+    def _write(self, state, action, reward, next_state):
+        slot = self.total % self.capacity
+        self.states[slot] = state
+        self.actions[slot] = action
+        self.rewards[slot] = reward
+        if next_state is None:
+            self.done[slot] = True
+            self.next_states[slot] = 0
+        else:
+            self.done[slot] = False
+            self.next_states[slot] = next_state
+        self.total += 1
+        return slot
+
+    def _batch_buffers(self, batch_size):
+        if self.batch is None or len(self.batch[0]) != batch_size:
+            columns = [np.empty((batch_size,) + column.shape[1:], dtype=column.dtype)
+                       for column in (self.states, self.actions, self.rewards, self.next_states, self.done)]
+            self.batch = (columns, [torch.from_numpy(column) for column in columns])
+        return self.batch
+
+    def gather(self, slots):
+        """(states, actions, rewards, next_states, done) tensors for the given slots."""
+        columns, tensors = self._batch_buffers(len(slots))
+        for source, out in zip((self.states, self.actions, self.rewards, self.next_states, self.done), columns):
+            np.take(source, slots, axis=0, out=out)
+        return tensors
+
+    def sample(self, batch_size):
+        """Uniformly draw batch_size distinct transitions; returns (slots, tensors, None).
+
+        The last item is the importance-sampling weights, which uniform sampling does not need.
+        """
+        with self.lock:
+            slots = self.rng.choice(len(self), batch_size, replace=False)
+            return slots, self.gather(slots), None
+
+class SumTree:
+    """Binary tree of priority sums over a fixed number of slots.
+
+    Leaves hold each slot's priority and every internal node the sum of its
+    children, so the root is the total. Updating a batch of leaves and drawing
+    a batch of slots in proportion to their priorities both walk one level at
+    a time for the whole batch, O(batch log capacity).
+    """
+    def __init__(self, capacity):
+        self.size = 1 << max(capacity - 1, 0).bit_length() # Leaves, rounded up to a power of two
+        self.depth = self.size.bit_length() - 1
+        self.tree = np.zeros(2 * self.size) # Node i has children 2i and 2i + 1; leaves start at size
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def __getitem__(self, slots):
+        return self.tree[self.size + np.asarray(slots)]
+
+    def update(self, slots, priorities):
+        nodes = self.size + np.asarray(slots)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Slots whose cumulative priority range contains each of `values` (0 <= value < total)."""
+        values = np.array(values, dtype=float)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            nodes <<= 1
+            left = self.tree[nodes]
+            right = values >= left
+            values -= left * right
+            nodes += right
+        # Rounding can walk past the last positive leaf onto an empty one; step back to it
+        slots = nodes - self.size
+        empty = self.tree[nodes] <= 0
+        if empty.any():
+            positive = np.flatnonzero(self.tree[self.size:] > 0)
+            slots[empty] = positive[np.clip(np.searchsorted(positive, slots[empty]) - 1, 0, None)]
+        return slots
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer that samples transitions in proportion to their TD error.
+
+    Slot priorities are (|TD error| + eps) ** alpha in a SumTree; new
+    transitions get the largest priority seen so far so each is replayed at
+    least once soon after it arrives. sample() draws one slot from each of
+    batch_size equal slices of the total priority and also returns importance-
+    sampling weights (N * P(i)) ** -beta, normalised by their maximum, that undo
+    the bias of non-uniform sampling in the loss. beta anneals linearly from
+    `beta` to 1 over `beta_steps` samples.
+    """
+    def __init__(self, capacity=10000, state_size=8, alpha=0.6, beta=0.4, beta_steps=100000, eps=1e-3, seed=None):
+        super().__init__(capacity, state_size, seed)
+        self.priorities = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = (1.0 - beta) / beta_steps
+        self.eps = eps
+        self.max_priority = 1.0
+        self.weights = None # Buffer and tensor for the last batch size sampled
+
+    def append(self, state, action, reward, next_state):
+        with self.lock:
+            slot = self._write(state, action, reward, next_state)
+            self.priorities.update([slot], self.max_priority)
+            return slot
+
+    def sample(self, batch_size):
+        """Draw batch_size transitions by priority; returns (slots, tensors, weights)."""
+        with self.lock:
+            total = self.priorities.total
+            values = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+            slots = self.priorities.find(values)
+            if self.weights is None or len(self.weights[0]) != batch_size:
+                weights = np.empty(batch_size, dtype=np.float32)
+                self.weights = (weights, torch.from_numpy(weights))
+            weights, weights_tensor = self.weights
+            # (N * P(i)) ** -beta divided by its maximum, which belongs to the smallest sampled P(i)
+            probabilities = self.priorities[slots] / total
+            np.power(probabilities / probabilities.min(), -self.beta, out=weights)
+            self.beta = min(1.0, self.beta + self.beta_increment)
+            return slots, self.gather(slots), weights_tensor
+
+    def update_priorities(self, slots, td_errors):
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        with self.lock:
+            self.priorities.update(slots, priorities)
+            self.max_priority = max(self.max_priority, float(priorities.max()))
+
 class ReinforcementLearner:
-    def __init__(self):
+    def __init__(self, snapshot_interval=10, memory_size=10000, prioritized=False):
         self.model = self._build_model()
         self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
-        self.memory = deque(maxlen=10000)
+        # Prioritized replay samples by TD error and weights the loss to correct for it
+        self.memory = PrioritizedReplayBuffer(memory_size) if prioritized else ReplayBuffer(memory_size)
         self.gamma = 0.95
+        # Actions come from a NumPy snapshot of the model, refreshed every snapshot_interval replays
+        self.policy = MLPSnapshot(self.model)
+        self.snapshot_interval = snapshot_interval
+        self.train_steps = 0
 
     def _build_model(self):
         return nn.Sequential(
@@ -193,50 +649,177 @@ class ReinforcementLearner:
         )
 
     def remember(self, state, action, reward, next_state):
-        self.memory.append((state, action, reward, next_state))
+        self.memory.append(state, action, reward, next_state)
 
     def get_action(self, state, exploration_rate=0.1):
         if np.random.rand() < exploration_rate:
             return np.random.randint(3)
-        state_tensor = torch.FloatTensor(state)
-        self.model.eval() # Set model to evaluation mode
-        with torch.no_grad(): # No gradient calculation needed for inference
-            act_values = self.model(state_tensor)
-        self.model.train() # Set model back to training mode
-        return torch.argmax(act_values).item()
+        return int(self.policy(state).argmax())
+
+    def get_actions(self, states, exploration_rate=0.1):
+        """Epsilon-greedy actions for a (batch, 8) array of states in one forward pass."""
+        actions = self.policy(states).argmax(axis=1)
+        explore = np.random.rand(len(actions)) < exploration_rate
+        actions[explore] = np.random.randint(3, size=int(explore.sum()))
+        return actions.tolist()
 
     def replay(self, batch_size=32):
         if len(self.memory) < batch_size:
             return
 
-        minibatch = random.sample(self.memory, batch_size)
-        states, actions, rewards, next_states = zip(*minibatch)
-
-        states_tensor = torch.FloatTensor(np.array(states))
-        actions_tensor = torch.LongTensor(actions)
-        rewards_tensor = torch.FloatTensor(rewards)
+        slots, (states, actions, rewards, next_states, done), weights = self.memory.sample(batch_size)
 
-        # Filter out None next_states for terminal states
-        non_final_mask = torch.tensor([s is not None for s in next_states], dtype=torch.bool)
-        non_final_next_states = torch.FloatTensor([s for s in next_states if s is not None])
+        current_q_values = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
 
-        current_q_values = self.model(states_tensor).gather(1, actions_tensor.unsqueeze(1)).squeeze(1)
+        # Terminal transitions have no next state to bootstrap from
+        with torch.no_grad():
+            next_q_values = self.model(next_states).max(1)[0].masked_fill(done, 0.0)
 
-        next_q_values = torch.zeros(batch_size)
-        if non_final_next_states.shape[0] > 0:
-            next_q_values[non_final_mask] = self.model(non_final_next_states).max(1)[0].detach()
-
-        expected_q_values = rewards_tensor + self.gamma * next_q_values
+        expected_q_values = rewards + self.gamma * next_q_values
 
         self.optimizer.zero_grad()
-        loss = nn.MSELoss()(current_q_values, expected_q_values)
+        if weights is None:
+            loss = nn.MSELoss()(current_q_values, expected_q_values)
+        else:
+            td_errors = expected_q_values - current_q_values
+            loss = (weights * td_errors.pow(2)).mean()
+            self.memory.update_priorities(slots, td_errors.detach().numpy())
         loss.backward()
         self.optimizer.step()
 
+        self.train_steps += 1
+        if self.train_steps % self.snapshot_interval == 0:
+            self.policy.refresh(self.model)
+
+# Virtual runtime charged to a new fair-share task before its first dispatch (1s)
+FAIR_SHARE_START_DEBIT = KERNEL_ACCOUNTING.to_time(1000)
+
+def priority_to_nice(priority):
+    """Map a task priority (1-100, 50 by default) onto nice 10..-10, one nice level per 5 points.
+
+    That spans a ~90x CPU-share ratio between priorities 1 and 100.
+    """
+    return max(-20, min(19, round((50 - priority) / 5)))
+
+def task_id_of(task):
+    """Queue key of a task: its 'id', else the 'queue_id' TaskQueue gave it (None before that)."""
+    if 'id' in task:
+        return task['id']
+    # Kept apart from explicit ids, which may be small integers too
+    return ('queue_id', task['queue_id']) if 'queue_id' in task else None
+
 class TaskQueue:
-    def __init__(self):
-        self.queue = []
+    """Queue of pending tasks, keyed by task id.
+
+    A task's id is its 'id' if it has one; otherwise the queue stores a fresh
+    'queue_id' in the task when it is first queued, so tasks may share a name.
+
+    By default tasks are kept in a binary heap ordered by priority, highest
+    first, with FIFO order among equal priorities. Changing or removing a task
+    only blanks its heap entry; blanked entries are dropped when they reach the
+    top or when they make up more than half of the heap. With fair_share=True
+    the queue is a CFS red-black tree keyed on each task's virtual runtime,
+    weighted by its priority through the kernel nice-to-weight table.
+    Dispatching a task charges its estimated_duration to its virtual runtime, so
+    a rescheduled or delayed task queues behind tasks that have had less service
+    and low-priority tasks cannot starve.
+
+    get_next_task() can block on a condition variable until work arrives, so
+    consumers are woken as soon as a task is queued instead of polling.
+    """
+    def __init__(self, fair_share=False):
+        self.heap = [] # [-priority, seq, task] entries
+        self.entries = {} # Task id -> live heap entry, or tree node in fair-share mode
+        self.seq = count()
+        self.queue_ids = count()
         self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.wakeups = 0 # Bumped by wake_all() to release blocked consumers
+        self.fair_share = fair_share
+        if fair_share:
+            self.tree = RedBlackTree(accounting=KERNEL_ACCOUNTING)
+            self.tasks = {} # Tree node PID -> task
+            self.ids = count(1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def snapshot(self):
+        """Queued tasks in dispatch order."""
+        with self.lock:
+            if not self.fair_share:
+                return [entry[2] for entry in sorted(self.entries.values())]
+            tasks = []
+            node = self.tree.pick_next()
+            while node is not None:
+                tasks.append(self.tasks[node.PID])
+                node = self.tree.successor(node)
+            return tasks
+
+    def replace(self, tasks):
+        """Requeue `tasks` in place of the current contents; equal priorities keep the given order."""
+        with self.lock:
+            task_ids = [task_id_of(task) for task in tasks if task_id_of(task) is not None]
+            if len(set(task_ids)) != len(task_ids):
+                raise ValueError("Tasks to requeue have duplicate ids")
+            self.heap = []
+            self.entries = {}
+            if self.fair_share:
+                self.tree = RedBlackTree(accounting=KERNEL_ACCOUNTING)
+                self.tasks = {}
+            for task in tasks:
+                self._enqueue(task)
+            self.not_empty.notify_all()
+
+    def _enqueue(self, task, vruntime=None):
+        task_id = task_id_of(task)
+        if task_id is None:
+            task['queue_id'] = next(self.queue_ids)
+            task_id = task_id_of(task)
+        elif task_id in self.entries:
+            raise ValueError(f"Task '{task_id}' is already queued")
+        if self.fair_share:
+            self.entries[task_id] = self._enqueue_fair(task, vruntime)
+            self.not_empty.notify()
+            return
+        entry = [-task['priority'], next(self.seq), task]
+        self.entries[task_id] = entry
+        heapq.heappush(self.heap, entry)
+        self.not_empty.notify()
+
+    def _enqueue_fair(self, task, vruntime=None):
+        tree = self.tree
+        weight = KERNEL_ACCOUNTING.weight(priority_to_nice(task['priority']))
+        debit = KERNEL_ACCOUNTING.delta_fair(FAIR_SHARE_START_DEBIT, weight)
+        # min_vruntime only advances on dispatch, so it still counts tasks that are
+        # out of the queue being executed or waiting to be rescheduled
+        base = tree.min_vruntime
+        if vruntime is None:
+            # Like the kernel's START_DEBIT: new tasks start one weighted slice out,
+            # so among tasks arriving together heavier ones are dispatched first
+            vruntime = base + debit
+        elif vruntime < base - debit:
+            # A rescheduled task keeps the service it was charged, but cannot bank
+            # more than one slice of credit while it was out of the queue
+            vruntime = base - debit
+        node = Node(next(self.ids), priority_to_nice(task['priority']), vruntime, weight=weight)
+        self.tasks[node.PID] = task
+        tree.insert(node)
+        return node
+
+    def _discard(self, task_id):
+        """Drop a task's queue entry and return the task."""
+        if self.fair_share:
+            node = self.entries.pop(task_id)
+            self.tree.delete_node(node)
+            return self.tasks.pop(node.PID)
+        entry = self.entries.pop(task_id)
+        task = entry[2]
+        entry[2] = None
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [entry for entry in self.heap if entry[2] is not None]
+            heapq.heapify(self.heap)
+        return task
 
     def add_task(self, task: Dict):
         with self.lock:
@@ -244,41 +827,140 @@ class TaskQueue:
             required_fields = {'name', 'priority', 'requirements'}
             if not all(field in task for field in required_fields):
                 raise ValueError("Task missing required fields")
+            self._enqueue(task)
 
-            self.queue.append(task)
-            self.queue.sort(key=lambda x: x['priority'], reverse=True)
+    def get_next_task(self, timeout=0):
+        """Dispatch the next task, or return None if there is none.
 
-    def get_next_task(self):
-        with self.lock:
-            if not self.queue:
+        With a timeout (seconds, or None to wait indefinitely) an empty queue
+        blocks until a task is queued, the timeout passes or wake_all() is
+        called.
+        """
+        with self.not_empty:
+            if timeout != 0:
+                self._wait(timeout)
+            return self._pop()
+
+    def get_next_tasks(self, max_tasks, timeout=0):
+        """Dispatch up to max_tasks tasks at once, blocking like get_next_task() only
+        while the queue is empty. Returns a possibly empty list."""
+        with self.not_empty:
+            if timeout != 0:
+                self._wait(timeout)
+            tasks = []
+            while len(tasks) < max_tasks:
+                task = self._pop()
+                if task is None:
+                    break
+                tasks.append(task)
+            return tasks
+
+    def _wait(self, timeout):
+        wakeups = self.wakeups
+        self.not_empty.wait_for(lambda: self.entries or self.wakeups != wakeups, timeout)
+
+    def _pop(self):
+        if self.fair_share:
+            node = self.tree.pick_next()
+            if node is None:
                 return None
-            return self.queue.pop(0)
+            self.tree.update_min_vruntime()
+            task = self._discard(task_id_of(self.tasks[node.PID]))
+            duration = KERNEL_ACCOUNTING.to_time(task.get('estimated_duration', 1) * 1000)
+            task['vruntime'] = node.vruntime + KERNEL_ACCOUNTING.delta_fair(duration, node.weight)
+            return task
+        heap = self.heap
+        while heap:
+            task = heapq.heappop(heap)[2]
+            if task is not None:
+                del self.entries[task_id_of(task)]
+                return task
+        return None
+
+    def wake_all(self):
+        """Release every consumer blocked in get_next_task()."""
+        with self.not_empty:
+            self.wakeups += 1
+            self.not_empty.notify_all()
 
     def reschedule_task(self, task):
         with self.lock:
-            self.queue.append(task)
-            self.queue.sort(key=lambda x: x['priority'], reverse=True)
+            self._enqueue(task, task.get('vruntime'))
+
+    def update_priority(self, task_id, new_priority):
+        """Change a queued task's priority; it goes behind tasks already at new_priority.
+
+        Only for tasks still in the queue. The engine's delay path cannot use it:
+        the engine dequeues a task before deciding what to do with it, so a
+        delayed task goes back in through reschedule_task(), which is O(log n)
+        too and in fair-share mode also charges the task for its dispatch.
+        """
+        with self.lock:
+            if self.fair_share:
+                node = self.entries[task_id]
+                self.tasks[node.PID]['priority'] = new_priority
+                self._renice(node, priority_to_nice(new_priority))
+                return
+            task = self._discard(task_id)
+            task['priority'] = new_priority
+            self._enqueue(task)
+
+    def _renice(self, node, niceValue):
+        """RunQueue.renice measured from the current min_vruntime, which it leaves alone.
+
+        RunQueue.renice first advances min_vruntime to the leftmost task; doing that
+        here would clamp the credit of tasks that are out being executed.
+        """
+        tree = self.tree
+        weight = KERNEL_ACCOUNTING.weight(niceValue)
+        base = tree.min_vruntime
+        tree.requeue(node, base + KERNEL_ACCOUNTING.rescale(node.vruntime - base, node.weight, weight))
+        tree.load += weight - node.weight
+        node.niceValue = niceValue
+        node.weight = weight
+
+    def remove(self, task_id):
+        """Take a task out of the queue without running it and return it."""
+        with self.lock:
+            return self._discard(task_id)
 
 class SchedulingEngine:
-    def __init__(self, scheduler_instance):
+    def __init__(self, scheduler_instance, idle_timeout=1.0, batch_size=None):
         self.scheduler = scheduler_instance # Pass the scheduler instance
         self.running = True
+        self.idle_timeout = idle_timeout # Seconds to wait for work before training the learner
+        # Up to this many queued tasks are decided together with one forward pass per model
+        self.batch_size = batch_size or scheduler_instance.config.get('decision_batch_size', 1)
         self.performance_log = []
         self.task_executor = TaskExecutor(self.scheduler) # Initialize executor here
 
     def run(self):
         """Main scheduling loop"""
         while self.running:
-            current_metrics = self.scheduler.monitor.collect_metrics()
-            task = self.scheduler.task_queue.get_next_task()
-
-            if task:
-                decision = self._make_scheduling_decision(task, current_metrics)
-                self._execute_decision(task, decision)
+            # Blocks until a task is queued, so new work is dispatched immediately
+            if self.batch_size > 1:
+                tasks = self.scheduler.task_queue.get_next_tasks(self.batch_size, timeout=self.idle_timeout)
+                if tasks:
+                    current_metrics = self.scheduler.monitor.get_metrics()
+                    decisions = self._make_scheduling_decisions(tasks, current_metrics)
+                    for task, decision in zip(tasks, decisions):
+                        self._execute_decision(task, decision)
+                    continue
             else:
-                # If no tasks, perhaps run learner replay or do nothing
-                self.scheduler.learner.replay() # Allow the learner to train even if no tasks
-            time.sleep(0.1)  # Prevent CPU overload
+                task = self.scheduler.task_queue.get_next_task(timeout=self.idle_timeout)
+                if task:
+                    current_metrics = self.scheduler.monitor.get_metrics()
+                    decision = self._make_scheduling_decision(task, current_metrics)
+                    self._execute_decision(task, decision)
+                    continue
+            if self.running:
+                # Idle for idle_timeout: let the learner train while there is no work
+                self.scheduler.learner.replay()
+
+    def stop(self):
+        """Stop the scheduling loop, waking it if it is waiting for work."""
+        self.running = False
+        self.scheduler.task_queue.wake_all()
 
     def _make_scheduling_decision(self, task, metrics):
         """Use AI models to make scheduling decisions"""
@@ -289,7 +971,7 @@ class SchedulingEngine:
             task['priority'],
             task['requirements'].get('cpu', 0),
             task['requirements'].get('memory', 0),
-            len(self.scheduler.task_queue.queue),
+            len(self.scheduler.task_queue),
             time.time() - task.get('created_time', time.time()),
             self._calculate_urgency(task) # This method needs to be implemented
         ]
@@ -305,9 +987,7 @@ class SchedulingEngine:
 
         # Get AI recommendations
         action = self.scheduler.learner.get_action(features)
-        predicted_time = self.scheduler.models['time_predictor'](
-            torch.FloatTensor(features[:6])
-        ).item()
+        predicted_time = float(self.scheduler.snapshots['time_predictor'](features[:6])[0])
 
         return {
             'action': action,
@@ -315,6 +995,36 @@ class SchedulingEngine:
             'features': features
         }
 
+    def _make_scheduling_decisions(self, tasks, metrics):
+        """Decide a batch of tasks with one feature matrix and one forward pass per model.
+
+        Rows use the same features as _make_scheduling_decision; the queue length
+        for each task also counts the tasks behind it in the batch.
+        """
+        now = time.time()
+        queued = len(self.scheduler.task_queue)
+        features = np.empty((len(tasks), 8), dtype=np.float32)
+        for i, task in enumerate(tasks):
+            requirements = task['requirements']
+            features[i] = (
+                metrics['cpu'],
+                metrics['memory'],
+                task['priority'],
+                requirements.get('cpu', 0),
+                requirements.get('memory', 0),
+                queued + len(tasks) - 1 - i,
+                now - task.get('created_time', now),
+                self._calculate_urgency(task)
+            )
+
+        actions = self.scheduler.learner.get_actions(features)
+        predicted_times = self.scheduler.snapshots['time_predictor'](features[:, :6])[:, 0].tolist()
+
+        return [
+            {'action': action, 'predicted_time': predicted_time, 'features': row}
+            for action, predicted_time, row in zip(actions, predicted_times, features.tolist())
+        ]
+
     def _execute_decision(self, task, decision):
         """Executes the scheduling decision using the TaskExecutor."""
         # The TaskExecutor needs to be aware of the decision
@@ -331,15 +1041,123 @@ class SchedulingEngine:
         urgency = time_in_queue * (task.get('priority', 50) / 100.0) # Scale priority 0-1
         return urgency
 
+class ResourceAccountant:
+    """Attributes CPU time, peak RSS and I/O bytes to running tasks.
+
+    Tasks run either on an executor thread, whose CPU time is read from the
+    thread's own clock when it finishes, or as a child process (tasks with a
+    'command'). Child processes are sampled together by one background pass
+    every `interval` seconds instead of each task polling on its own, so peak
+    RSS is the largest sampled value and I/O bytes are those of the last pass
+    before the child exited. CPU time is exact: wait() takes it from the
+    kernel's rusage when the child is reaped (ru_maxrss is not used because it
+    counts the forking parent's memory from before the exec).
+    """
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.running = {} # Token from track_*() -> usage being accumulated
+        self.tokens = count()
+        self.lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def track_thread(self):
+        """Start accounting for a task running on the calling thread; returns its token."""
+        with self.lock:
+            token = next(self.tokens)
+            self.running[token] = {'cpu_start': time.thread_time(), 'process': None, 'cpu_time': 0.0,
+                                   'rss_peak': None, 'io_read_bytes': None, 'io_write_bytes': None}
+            return token
+
+    def track_process(self, popen):
+        """Start accounting for a task running as the child `popen` (a subprocess.Popen);
+        returns its token."""
+        usage = {'cpu_start': None, 'process': None, 'cpu_time': 0.0,
+                 'rss_peak': 0, 'io_read_bytes': 0, 'io_write_bytes': 0}
+        try:
+            usage['process'] = psutil.Process(popen.pid)
+            self._sample_process(usage)
+        except psutil.NoSuchProcess:
+            pass # Already exited; wait() still collects its rusage
+        with self.lock:
+            token = next(self.tokens)
+            self.running[token] = usage
+            return token
+
+    def wait(self, token, popen):
+        """Reap a tracked child and record its final CPU time; returns the exit code."""
+        if not hasattr(os, 'wait4'):
+            return popen.wait()
+        _, status, rusage = os.wait4(popen.pid, 0)
+        popen.returncode = os.waitstatus_to_exitcode(status)
+        with self.lock:
+            usage = self.running.get(token)
+            if usage is not None:
+                usage['process'] = None
+                usage['cpu_time'] = rusage.ru_utime + rusage.ru_stime
+        return popen.returncode
+
+    def sample(self):
+        """Update every running child process in one pass."""
+        with self.lock:
+            processes = [usage for usage in self.running.values() if usage['process'] is not None]
+        for usage in processes:
+            self._sample_process(usage)
+
+    def _sample_process(self, usage):
+        process = usage['process']
+        if process is None:
+            return
+        try:
+            with process.oneshot():
+                cpu = process.cpu_times()
+                rss = process.memory_info().rss
+                io = process.io_counters() if hasattr(process, 'io_counters') else None
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return
+        with self.lock:
+            if usage['process'] is not process:
+                return # Reaped while sampling; wait() has recorded the exact CPU time
+            usage['cpu_time'] = cpu.user + cpu.system
+            usage['rss_peak'] = max(usage['rss_peak'], rss)
+            if io is not None:
+                usage['io_read_bytes'] = io.read_bytes
+                usage['io_write_bytes'] = io.write_bytes
+
+    def finish(self, token):
+        """Stop accounting for a task and return what it used (empty if it was never tracked)."""
+        with self.lock:
+            usage = self.running.pop(token, None)
+        if usage is None:
+            return {}
+        if usage['cpu_start'] is not None:
+            usage['cpu_time'] = time.thread_time() - usage['cpu_start']
+        return {key: usage[key] for key in ('cpu_time', 'rss_peak', 'io_read_bytes', 'io_write_bytes')}
+
 class TaskExecutor:
     def __init__(self, scheduler):
         self.scheduler = scheduler
         self.thread_pool = ThreadPoolExecutor(max_workers=4)
         self.current_tasks = {}
+        self.accountant = ResourceAccountant(scheduler.config.get('resource_interval', 0.5))
+        self.accountant.start()
 
     def execute_task(self, task, decision):
         """Execute task based on scheduling decision"""
         if decision['action'] == 0:  # Delay
+            # The task was dequeued for the decision, so it is requeued rather than reprioritized
             task['priority'] = max(1, task['priority'] - 10) # Reduce priority
             print(f"Task '{task['name']}' delayed. New priority: {task['priority']}")
             self.scheduler.task_queue.reschedule_task(task)
@@ -353,7 +1171,8 @@ class TaskExecutor:
 
         print(f"Executing task: {task['name']} with predicted time {decision['predicted_time']:.2f}s")
         future = self.thread_pool.submit(self._run_task, task)
-        self.current_tasks[task['name']] = {
+        # Keyed by queue id: running tasks may share a name
+        self.current_tasks[task_id_of(task)] = {
             'future': future,
             'start_time': time.time(),
             'task': task,
@@ -362,16 +1181,29 @@ class TaskExecutor:
         future.add_done_callback(self._task_complete_callback)
 
     def _run_task(self, task):
-        """Actual task execution logic"""
-        # This would be replaced with actual task execution
+        """Actual task execution logic; returns (success, resources used)"""
+        token = None # Tasks may share a name, so usage is tracked by token
         try:
+            command = task.get('command')
+            if command:
+                # Run as a child process so its CPU, memory and I/O can be measured
+                process = subprocess.Popen(command, shell=isinstance(command, str))
+                token = self.accountant.track_process(process)
+                returncode = self.accountant.wait(token, process)
+                if returncode != 0:
+                    print(f"Task '{task['name']}' failed with exit code {returncode}.")
+                    return False, self.accountant.finish(token)
+                print(f"Task '{task['name']}' completed successfully.")
+                return True, self.accountant.finish(token)
+            # This would be replaced with actual task execution
+            token = self.accountant.track_thread()
             duration = task.get('estimated_duration', 1)
             time.sleep(duration)
             print(f"Task '{task['name']}' completed successfully in {duration:.2f}s.")
-            return True
+            return True, self.accountant.finish(token)
         except Exception as e:
             print(f"Task '{task['name']}' failed: {e}")
-            return False
+            return False, self.accountant.finish(token)
 
     def _task_complete_callback(self, future):
         """Handle task completion"""
@@ -389,7 +1221,7 @@ class TaskExecutor:
         task_info = task_data['task']
         start_time = time.time() # Should be task_data['start_time']
         end_time = time.time()
-        success = future.result()
+        success, resources = future.result()
         actual_duration = end_time - task_data['start_time'] # Corrected calculation
 
         print(f"Callback for task '{task_info['name']}'. Success: {success}, Actual Duration: {actual_duration:.2f}s")
@@ -402,7 +1234,8 @@ class TaskExecutor:
             'success': success,
             'actual_duration': actual_duration,
             'predicted_duration': task_data['decision']['predicted_time'],
-            'metrics_at_completion': self.scheduler.monitor.collect_metrics() # Log metrics at completion
+            'resources': resources, # What the task itself used
+            'metrics_at_completion': dict(self.scheduler.monitor.get_metrics()) # Log metrics at completion
         }
 
         # Update learning models
@@ -412,7 +1245,7 @@ class TaskExecutor:
             task_info['priority'],
             task_info['requirements'].get('cpu', 0),
             task_info['requirements'].get('memory', 0),
-            len(self.scheduler.task_queue.queue),
+            len(self.scheduler.task_queue),
             0, # Time in queue for the *next* state (as this task is done)
             0  # Urgency for the *next* state (as this task is done)
         ]
@@ -460,6 +1293,14 @@ class TaskExecutor:
         if memory_usage > self.scheduler.monitor.resource_thresholds['memory']:
             reward -= (memory_usage - self.scheduler.monitor.resource_thresholds['memory']) * 0.1
 
+        # Penalize tasks that used more CPU than they asked for
+        cpu_time = result.get('resources', {}).get('cpu_time')
+        if cpu_time is not None and result['actual_duration'] > 0:
+            cpu_percent = 100 * cpu_time / result['actual_duration']
+            cpu_req = result['task']['requirements'].get('cpu', 0)
+            if cpu_percent > cpu_req:
+                reward -= (cpu_percent - cpu_req) * 0.05
+
         return reward
 
 class PersistenceManager:
@@ -469,6 +1310,9 @@ class PersistenceManager:
 
     @staticmethod
     def load_model(model, path):
+        """Load weights into `model`. Inference reads NumPy snapshots of the models, so
+        callers must then call AITaskScheduler.refresh_snapshots(); AITaskScheduler.load_model
+        does both."""
         try:
             model.load_state_dict(torch.load(path))
             model.eval() # Set to evaluation mode after loading
@@ -550,20 +1394,16 @@ class MetaLearner:
 
     def _evaluate_performance(self):
         """Evaluate current configuration performance"""
-        recent_tasks = self.scheduler.monitor.task_history[-100:]
-        if not recent_tasks:
+        history = self.scheduler.monitor.task_history
+        if not len(history):
             return 0
 
         # Calculate average success rate and average duration to reward better performance
-        successful_tasks = [t for t in recent_tasks if t.get('success', False)]
-        if not successful_tasks:
+        success_rate = history.success_rate(last=100)
+        if not success_rate:
             return 0 # No successful tasks to evaluate
 
-        avg_completion_time = sum(
-            t['actual_duration'] for t in successful_tasks
-        ) / len(successful_tasks)
-
-        success_rate = len(successful_tasks) / len(recent_tasks)
+        avg_completion_time = history.mean_duration(last=100)
 
         # A higher success rate is better, a lower completion time is better.
         # We want to maximize this value.
@@ -853,6 +1693,7 @@ class SelfHealingSystem:
         self.scheduler = scheduler
         self.failure_patterns = []
         self.error_buffer = deque(maxlen=100)
+        self.history_cursor = 0 # Number of logged results already checked for failures
         self._DictVectorizer = None
         self._DBSCAN = None
         try:
@@ -868,14 +1709,11 @@ class SelfHealingSystem:
         while True:
             # In a real system, this would receive failure notifications from TaskExecutor
             # For this example, we'll just periodically check task history
-            # and analyze new failed tasks that haven't been analyzed.
-            unanalysed_failures = [
-                t for t in self.scheduler.monitor.task_history
-                if not t.get('success', True) and not t.get('analyzed', False)
-            ]
+            # and analyze failed tasks logged since the last check.
+            unanalysed_failures, self.history_cursor = \
+                self.scheduler.monitor.task_history.failures_since(self.history_cursor)
             for task in unanalysed_failures:
                 self._analyze_failure(task)
-                task['analyzed'] = True # Mark as analyzed
 
             time.sleep(5) # Check every 5 seconds
 
@@ -945,7 +1783,7 @@ class AITaskSchedulerComplete(AITaskScheduler):
         self.executor.submit(self.context_manager.continuous_update)
         self.executor.submit(self.meta_learner.continuous_optimization)
         self.executor.submit(self.self_healing.monitor_errors)
-        self.executor.submit(self.monitor.continuous_monitoring)
+        self.executor.submit(self.monitor.continuous_monitoring, self.config.get('metrics_interval', 1.0))
 
     def schedule_task(self, task):
         """Enhanced scheduling with all advanced features"""
@@ -957,12 +1795,13 @@ class AITaskSchedulerComplete(AITaskScheduler):
             self.task_queue.add_task(task)
             return {'action': 'defer', 'reason': 'context'}
 
-        if self.context_manager.user_context['power_status'] == 'battery':
+        if self.context_manager.user_context['power_status'] == 'battery' and not self.task_queue.fair_share:
             # Re-sort the entire queue to prioritize power efficiency
             # This is a simplified approach; in a real system, this might be more nuanced.
-            current_tasks_in_queue = list(self.task_queue.queue) # Get current tasks
+            # Fair-share queues keep their virtual-runtime order instead.
+            current_tasks_in_queue = self.task_queue.snapshot() # Get current tasks
             optimized_tasks = self.power_optimizer.optimize_for_battery(current_tasks_in_queue + [task])
-            self.task_queue.queue = optimized_tasks # Replace queue with optimized order
+            self.task_queue.replace(optimized_tasks) # Replace queue with optimized order
             print(f"Power optimizer applied for task '{task['name']}'. Queue reordered.")
         else:
             self.task_queue.add_task(task) # Add normally if not on battery
@@ -972,12 +1811,13 @@ class AITaskSchedulerComplete(AITaskScheduler):
     def shutdown(self):
         """Gracefully shut down all services."""
         print("Initiating shutdown...")
-        self.scheduling_engine.running = False # Stop the main scheduling loop
+        self.scheduling_engine.stop() # Stop the main scheduling loop
         self.monitor.stop_monitoring() # Stop continuous monitoring
         # Optionally, stop other continuous loops from meta_learner, context_manager, self_healing
         # by adding self._running flags to those classes as well.
 
         self.executor.shutdown(wait=True) # Wait for all submitted tasks to complete
+        self.scheduling_engine.task_executor.accountant.stop()
         print("AITaskSchedulerComplete shut down.")
 
 if __name__ == "__main__":
@@ -1007,7 +1847,7 @@ if __name__ == "__main__":
             time.sleep(1)
             # You can add interactive elements here, like adding new tasks
             # or querying system status.
-            # print(f"Queue size: {len(scheduler.task_queue.queue)}")
+            # print(f"Queue size: {len(scheduler.task_queue)}")
             # print(f"Currently executing tasks: {list(scheduler.scheduling_engine.task_executor.current_tasks.keys())}")
 
     except KeyboardInterrupt:
@@ -0,0 +1,410 @@
+import os
+import math
+import json
+import time
+import tempfile
+import random
+import argparse
+import tracemalloc
+
+from cfsScheduler import (Node, RedBlackTree, CompactRedBlackTree, MultiCoreSimulator, BACKENDS,
+                          BatchSimulator, run_scenario, run_headless, run_sliced, SchedTunables, ACCOUNTING,
+                          EEVDFTree, run_wakeup_workload, GroupScheduler, jain_index,
+                          read_workload, replay_workload)
+
+
+def _random_tasks(n, seed=0):
+    rng = random.Random(seed)
+    return [(pid, rng.randint(0, 10), rng.uniform(0, 1000), rng.uniform(10, 20)) for pid in range(1, n + 1)]
+
+
+def _fill_object_tree(tasks):
+    tree = RedBlackTree()
+    for pid, nice, vruntime, exec_time in tasks:
+        tree.insert(Node(PID=pid, niceValue=nice, vruntime=vruntime, timeToExec=exec_time))
+    return tree
+
+
+def _fill_compact_tree(tasks):
+    tree = CompactRedBlackTree(len(tasks))
+    for pid, nice, vruntime, exec_time in tasks:
+        tree.insert_task(pid, nice, vruntime, 0, exec_time)
+    return tree
+
+
+def bench_tree_backends(sizes, cycles=100000):
+    """Compare memory and throughput of RedBlackTree against CompactRedBlackTree.
+
+    For every size the tree is filled with that many tasks, then `cycles`
+    delete_min/insert pairs are timed. Memory is measured on a second, traced fill
+    so that tracemalloc overhead does not distort the timings.
+    """
+    print(f"{'tasks':>10} {'backend':>8} {'MiB':>9} {'B/task':>7} {'insert/s':>11} {'cycle/s':>11}")
+    for n in sizes:
+        tasks = _random_tasks(n)
+        for name, fill in (('object', _fill_object_tree), ('compact', _fill_compact_tree)):
+            tracemalloc.start()
+            tree = fill(tasks)
+            used, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del tree
+
+            start = time.perf_counter()
+            tree = fill(tasks)
+            fill_time = time.perf_counter() - start
+
+            rounds = min(cycles, n)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                task = tree.delete_min()
+                task.vruntime += 1024 / task.weight
+                tree.insert(task)
+            cycle_time = time.perf_counter() - start
+
+            print(f"{n:>10} {name:>8} {used / 2**20:>9.1f} {used / n:>7.0f} "
+                  f"{n / fill_time:>11.0f} {rounds / cycle_time:>11.0f}")
+            del tree
+
+
+def bench_pick_next(sizes, ticks=100000):
+    """Per-tick cost of the simulation loop before and after the cached leftmost.
+
+    "walk" is the old loop: minimum() from the root, delete, bump vruntime and
+    reinsert. "cached" peeks the cached leftmost and re-keys it with requeue().
+    """
+    print(f"{'tasks':>10} {'walk ns/tick':>13} {'cached ns/tick':>15} {'speedup':>8}")
+    for n in sizes:
+        rng = random.Random(1)
+        deltas = [rng.uniform(1, 5) for _ in range(ticks)]
+
+        tree = _fill_object_tree(_random_tasks(n))
+        start = time.perf_counter()
+        for delta in deltas:
+            task = tree.minimum(tree.root)
+            tree.delete_node(task)
+            task.vruntime += delta * (1024 / task.weight)
+            tree.insert(task)
+        walk = (time.perf_counter() - start) / ticks
+
+        tree = _fill_object_tree(_random_tasks(n))
+        start = time.perf_counter()
+        for delta in deltas:
+            task = tree.pick_next()
+            tree.requeue(task, task.vruntime + delta * (1024 / task.weight))
+        cached = (time.perf_counter() - start) / ticks
+
+        print(f"{n:>10} {walk * 1e9:>13.0f} {cached * 1e9:>15.0f} {walk / cached:>8.2f}")
+
+
+def bench_stress(tasks, ticks, report_every=100000):
+    """Long-run churn on RedBlackTree reporting height and per-tick latency.
+
+    Every tick runs the leftmost task; finished tasks are deleted and replaced by
+    a new arrival placed at the current minimum vruntime, so the tree keeps a
+    constant population while nodes are continuously removed from arbitrary spots.
+    """
+    rng = random.Random(2)
+    tree = RedBlackTree()
+    next_pid = 1
+    for _ in range(tasks):
+        tree.insert(Node(PID=next_pid, niceValue=rng.randint(0, 10), timeToExec=rng.uniform(10, 20)))
+        next_pid += 1
+    bound = 2 * math.log2(tasks + 1)
+    print(f"{'tick':>10} {'height':>7} {'2log2(n+1)':>11} {'mean ns':>8} {'max ns':>8}")
+    clock = time.perf_counter_ns
+    total = worst = 0
+    for tick in range(1, ticks + 1):
+        start = clock()
+        task = tree.pick_next()
+        delta = rng.uniform(1, 5)
+        if delta > task.timeToExec:
+            delta = task.timeToExec
+        task.timeToExec -= delta
+        vruntime = task.vruntime + delta * (1024 / task.weight)
+        if task.timeToExec > 0:
+            tree.requeue(task, vruntime)
+        else:
+            tree.delete_node(task)
+            tree.insert(Node(PID=next_pid, niceValue=rng.randint(0, 10), vruntime=tree.pick_next().vruntime,
+                             timeToExec=rng.uniform(10, 20)))
+            next_pid += 1
+        elapsed = clock() - start
+        total += elapsed
+        if elapsed > worst:
+            worst = elapsed
+        if tick % report_every == 0:
+            height = tree.height()
+            print(f"{tick:>10} {height:>7} {bound:>11.1f} {total / report_every:>8.0f} {worst:>8}")
+            if height > bound:
+                raise RuntimeError(f"tree height {height} exceeds the red-black bound {bound:.1f}")
+            total = worst = 0
+    tree.check_invariants()
+
+
+def bench_multicore(core_counts, tasks_per_core=50):
+    """Fairness, throughput and balancing cost of MultiCoreSimulator from 1 to N cores."""
+    print(f"{'cores':>6} {'tasks':>7} {'tasks/ms':>9} {'speedup':>8} {'fairness':>9} "
+          f"{'migrations':>11} {'mig ms':>8} {'util min':>9} {'util max':>9}")
+    base = None
+    for cores in core_counts:
+        rng = random.Random(3)
+        sim = MultiCoreSimulator(cores, rng=rng)
+        for pid in range(1, cores * tasks_per_core + 1):
+            sim.add_task(Node(PID=pid, niceValue=rng.randint(0, 10), timeToExec=rng.uniform(10, 20)))
+        stats = sim.run()
+        if base is None:
+            base = stats['throughput']
+        print(f"{cores:>6} {stats['completed']:>7} {stats['throughput']:>9.3f} {stats['throughput'] / base:>8.2f} "
+              f"{stats['fairness']:>9.3f} {stats['migrations']:>11} {stats['migration_overhead']:>8.1f} "
+              f"{min(stats['utilization']):>9.1%} {max(stats['utilization']):>9.1%}")
+
+
+NICE_DISTRIBUTIONS = {
+    'nice0': lambda rng: 0,
+    'uniform': lambda rng: rng.randint(0, 10),
+    'bimodal': lambda rng: rng.choice((0, 10)),
+}
+
+
+def bench_runqueues(sizes, ops=100000, backends=None, distributions=None):
+    """Insert, tick (pick_next + requeue) and drain (delete_min) throughput plus memory per backend.
+
+    Tasks start at random vruntimes in [0, 1000); each tick charges the picked task
+    a 1-5 ms slice scaled by 1024 / weight, as the simulation loop does.
+    """
+    backends = backends or sorted(BACKENDS)
+    distributions = distributions or sorted(NICE_DISTRIBUTIONS)
+    print(f"{'tasks':>9} {'nice':>8} {'backend':>9} {'MiB':>7} {'insert/s':>10} {'tick/s':>10} {'drain/s':>10}")
+    for n in sizes:
+        for dist in distributions:
+            rng = random.Random(4)
+            nice = NICE_DISTRIBUTIONS[dist]
+            specs = [(pid, nice(rng), rng.uniform(0, 1000)) for pid in range(1, n + 1)]
+            deltas = [rng.uniform(1, 5) for _ in range(ops)]
+            for name in backends:
+                cls = BACKENDS[name]
+                tracemalloc.start()
+                rq = cls()
+                for pid, nice_value, vruntime in specs:
+                    rq.insert(Node(PID=pid, niceValue=nice_value, vruntime=vruntime))
+                used, _ = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                del rq
+
+                nodes = [Node(PID=pid, niceValue=nice_value, vruntime=vruntime) for pid, nice_value, vruntime in specs]
+                rq = cls()
+                start = time.perf_counter()
+                for node in nodes:
+                    rq.insert(node)
+                insert_rate = n / (time.perf_counter() - start)
+
+                pick_next, requeue = rq.pick_next, rq.requeue
+                start = time.perf_counter()
+                for delta in deltas:
+                    task = pick_next()
+                    requeue(task, task.vruntime + delta * (1024 / task.weight))
+                tick_rate = ops / (time.perf_counter() - start)
+
+                drain = min(n, ops)
+                start = time.perf_counter()
+                for _ in range(drain):
+                    rq.delete_min()
+                drain_rate = drain / (time.perf_counter() - start)
+
+                print(f"{n:>9} {dist:>8} {name:>9} {used / 2**20:>7.1f} {insert_rate:>10.0f} "
+                      f"{tick_rate:>10.0f} {drain_rate:>10.0f}")
+
+
+def bench_batch(scenario_counts, tasks=16):
+    """Wall time of BatchSimulator against looping run_scenario over the same scenarios."""
+    import numpy as np
+    print(f"{'scenarios':>10} {'tasks':>6} {'scalar s':>9} {'batch s':>8} {'speedup':>8}")
+    for scenarios in scenario_counts:
+        rng = np.random.default_rng(5)
+        nice = rng.integers(0, 11, (scenarios, tasks))
+        exec_time = rng.uniform(10, 20, (scenarios, tasks))
+        # Enough slices for every scenario: each tick runs at least 1 ms of work
+        deltas = rng.uniform(1, 5, (int(exec_time.sum(axis=1).max()) + 1, scenarios))
+
+        start = time.perf_counter()
+        for s in range(scenarios):
+            run_scenario(nice[s].tolist(), exec_time[s].tolist(), deltas[:, s].tolist())
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        BatchSimulator(nice, exec_time).run(deltas)
+        batch = time.perf_counter() - start
+        print(f"{scenarios:>10} {tasks:>6} {scalar:>9.2f} {batch:>8.2f} {scalar / batch:>8.1f}")
+
+
+def bench_accounting(sizes, ticks=200000):
+    """Headless ticks/s with legacy float accounting against kernel fixed-point accounting.
+
+    Each kernel run is repeated to confirm that the final vruntimes are
+    bit-identical for the same seed.
+    """
+    print(f"{'tasks':>9} {'accounting':>11} {'ticks/s':>10} {'reproducible':>13}")
+    for n in sizes:
+        for name, accounting in sorted(ACCOUNTING.items()):
+            results = []
+            for _ in range(2):
+                rng = random.Random(6)
+                tree = RedBlackTree(accounting=accounting)
+                for pid in range(1, n + 1):
+                    nice = rng.randint(0, 10)
+                    tree.insert(Node(PID=pid, niceValue=nice, weight=accounting.weight(nice),
+                                     timeToExec=accounting.to_time(rng.uniform(10, 20))))
+                start = time.perf_counter()
+                done = run_headless(tree, ticks, rng=rng)
+                rate = done / (time.perf_counter() - start)
+                results.append(sorted((node.PID, node.vruntime) for node in tree.tasks.values()))
+            print(f"{n:>9} {name:>11} {rate:>10.0f} {str(results[0] == results[1]):>13}")
+
+
+def bench_slices(task_counts, duration=1000.0, switch_cost=0.005):
+    """Context-switch rate and throughput lost to switching as nr_running grows.
+
+    Runs CPU-bound tasks (which never finish within `duration` ms) with default
+    CFS tunables and a `switch_cost` ms overhead per context switch.
+    """
+    tunables = SchedTunables(context_switch_cost=switch_cost)
+    print(f"{'nr_running':>10} {'period ms':>10} {'slice ms':>9} {'switches/s':>11} {'lost':>7}")
+    for n in task_counts:
+        rng = random.Random(7)
+        tree = RedBlackTree()
+        for pid in range(1, n + 1):
+            tree.insert(Node(PID=pid, niceValue=rng.randint(0, 10), timeToExec=float('inf')))
+        result = run_sliced(tree, tunables, max_time=duration)
+        print(f"{n:>10} {tunables.period(n):>10.2f} {result['busy'] / result['ticks']:>9.3f} "
+              f"{result['switch_rate'] * 1000:>11.0f} {result['lost_fraction']:>7.2%}")
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def bench_eevdf(hog_counts, interactive=4, short_slice=0.25, duration=5000.0, seed=3):
+    """Wakeup latency of interactive tasks next to CPU hogs: CFS vs EEVDF picking.
+
+    Interactive tasks run ~0.5 ms bursts between ~5 ms sleeps; hogs never sleep.
+    Both schedulers replay the same seeded workload for `duration` ms with
+    default tunables; under EEVDF the interactive tasks request `short_slice`
+    ms slices while hogs keep the default.
+    """
+    tunables = SchedTunables()
+    print(f"{'hogs':>5} {'scheduler':>9} {'wakeups':>8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} "
+          f"{'max ms':>7} {'hog share':>9}")
+    for hogs in hog_counts:
+        workload = [(pid, 0, 0.5, 5.0, short_slice) for pid in range(1, interactive + 1)]
+        workload += [(pid, 0, 0, None, None) for pid in range(interactive + 1, interactive + hogs + 1)]
+        for name, tree in (("cfs", RedBlackTree()), ("eevdf", EEVDFTree(tunables.min_granularity))):
+            latencies, cpu_time = run_wakeup_workload(tree, tunables, workload, duration, seed)
+            waits = sorted(w for pid in range(1, interactive + 1) for w in latencies[pid])
+            hog_share = sum(cpu_time[pid] for pid in cpu_time if pid > interactive) / sum(cpu_time.values())
+            print(f"{hogs:>5} {name:>9} {len(waits):>8} {_percentile(waits, 0.5):>7.3f} "
+                  f"{_percentile(waits, 0.9):>7.3f} {_percentile(waits, 0.99):>7.3f} {waits[-1]:>7.3f} "
+                  f"{hog_share:>9.1%}")
+
+
+def bench_groups(task_counts, small=5, duration=10000.0):
+    """CPU share of a 5-task tenant next to a tenant with N tasks, flat vs grouped.
+
+    Flat puts every task in the root runqueue; grouped gives each tenant a task
+    group with equal shares. All tasks are CPU-bound nice-0 tasks.
+    """
+    print(f"{'big tenant':>10} {'mode':>8} {'small share':>11} {'big fairness':>12} {'time s':>7}")
+    for n in task_counts:
+        for mode in ("flat", "grouped"):
+            sched = GroupScheduler()
+            big = small_group = '/'
+            if mode == "grouped":
+                big = sched.create_group("big").name
+                small_group = sched.create_group("small").name
+            for pid in range(n):
+                sched.add_task(Node(PID=pid, timeToExec=float('inf')), big)
+            for pid in range(n, n + small):
+                sched.add_task(Node(PID=pid, timeToExec=float('inf')), small_group)
+            tasks = {pid: sched.task_group[pid].runqueue.tasks[pid] for pid in sched.task_group}
+            start = time.perf_counter()
+            sched.run(max_time=duration)
+            elapsed = time.perf_counter() - start
+            share = sum(tasks[pid].dealtExec for pid in range(n, n + small)) / sched.root.cpuTime
+            fairness = jain_index([tasks[pid].dealtExec for pid in range(n)])
+            print(f"{n:>10} {mode:>8} {share:>11.1%} {fairness:>12.3f} {elapsed:>7.2f}")
+
+
+def _write_workload(path, n, load=0.8, seed=0):
+    """Write an n-task JSONL trace whose offered load is `load` of one CPU."""
+    rng = random.Random(seed)
+    arrival = 0.0
+    with open(path, "w") as f:
+        for pid in range(1, n + 1):
+            bursts = [round(rng.uniform(0.5, 5), 3) for _ in range(rng.randint(1, 4))]
+            sleeps = [round(rng.uniform(1, 20), 3) for _ in bursts[1:]]
+            arrival += rng.expovariate(load / sum(bursts))
+            f.write(json.dumps({"arrival": round(arrival, 3), "pid": pid, "nice": rng.randint(0, 10),
+                                "bursts": bursts, "sleeps": sleeps}) + "\n")
+
+
+def bench_replay(task_counts):
+    """Replay speed and peak memory of streaming JSONL traces of growing length.
+
+    Peak memory should stay flat as the trace grows, since only live tasks are
+    kept.
+    """
+    print(f"{'tasks':>9} {'trace MiB':>9} {'time s':>7} {'tasks/s':>9} {'peak KiB':>9} {'mean wait ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in task_counts:
+            path = os.path.join(tmp, f"workload-{n}.jsonl")
+            _write_workload(path, n)
+            tracemalloc.start()
+            start = time.perf_counter()
+            finished = total_wait = 0
+            for PID, arrival, finish, cpu, wait in replay_workload(read_workload(path), RedBlackTree()):
+                finished += 1
+                total_wait += wait
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{n:>9} {os.path.getsize(path) / 2**20:>9.1f} {elapsed:>7.2f} {finished / elapsed:>9.0f} "
+                  f"{peak / 1024:>9.0f} {total_wait / finished:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CFS runqueue benchmarks")
+    parser.add_argument("benchmark", nargs="?", default="backends", choices=["backends", "pick-next", "stress", "multicore", "runqueues", "batch", "accounting", "slices", "eevdf", "groups", "replay"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**4, 10**5, 10**6],
+                        help="task counts to benchmark (10**7 needs several GiB for the object tree)")
+    parser.add_argument("--cycles", type=int, default=100000)
+    parser.add_argument("--ticks", type=int, default=2000000, help="ticks for the stress benchmark")
+    parser.add_argument("--cores", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--nr-running", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128],
+                        help="runnable task counts for the slices benchmark")
+    parser.add_argument("--hogs", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="CPU hog counts for the eevdf benchmark")
+    parser.add_argument("--tenant-sizes", type=int, nargs="+", default=[5, 50, 500],
+                        help="task counts of the big tenant in the groups benchmark")
+    args = parser.parse_args()
+    if args.benchmark == "backends":
+        bench_tree_backends(args.sizes, args.cycles)
+    elif args.benchmark == "pick-next":
+        bench_pick_next(args.sizes, args.cycles)
+    elif args.benchmark == "stress":
+        for n in args.sizes:
+            bench_stress(n, args.ticks)
+    elif args.benchmark == "runqueues":
+        bench_runqueues(args.sizes, args.cycles)
+    elif args.benchmark == "accounting":
+        bench_accounting(args.sizes, args.cycles)
+    elif args.benchmark == "slices":
+        bench_slices(args.nr_running)
+    elif args.benchmark == "eevdf":
+        bench_eevdf(args.hogs)
+    elif args.benchmark == "groups":
+        bench_groups(args.tenant_sizes)
+    elif args.benchmark == "replay":
+        bench_replay(args.sizes)
+    elif args.benchmark == "batch":
+        bench_batch(args.sizes)
+    elif args.benchmark == "multicore":
+        bench_multicore(args.cores)
@@ -1,12 +1,145 @@
 import sys
+import csv
+import json
+import math
+import time
+import heapq
+import argparse
 import random
+import struct
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import count, islice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def nice_to_weight(niceValue):
+    """Legacy weight 1024 // (1 + nice). The formula has no weights for negative nice
+    values, so those are rejected (use KERNEL_ACCOUNTING for -20..-1). Accepts a
+    NumPy array of nice values too."""
+    if np is not None and isinstance(niceValue, np.ndarray):
+        if (niceValue < 0).any():
+            raise ValueError("legacy weights need nice values >= 0")
+        return 1024 // (1 + niceValue)
+    if niceValue < 0:
+        raise ValueError(f"nice value {niceValue} below 0 has no legacy weight")
+    return 1024 // (1 + niceValue)
+
+NICE_0_LOAD = 1024
+WMULT_SHIFT = 32
+WMULT_CONST = (1 << 32) - 1
+
+# Linux kernel/sched/core.c: sched_prio_to_weight[] and sched_prio_to_wmult[], nice -20..19
+SCHED_PRIO_TO_WEIGHT = (
+    88761, 71755, 56483, 46273, 36291,
+    29154, 23254, 18705, 14949, 11916,
+    9548, 7620, 6100, 4904, 3906,
+    3121, 2501, 1991, 1586, 1277,
+    1024, 820, 655, 526, 423,
+    335, 272, 215, 172, 137,
+    110, 87, 70, 56, 45,
+    36, 29, 23, 18, 15,
+)
+SCHED_PRIO_TO_WMULT = (
+    48388, 59856, 76040, 92818, 118348,
+    147320, 184698, 229616, 287308, 360437,
+    449829, 563644, 704093, 875809, 1099582,
+    1376151, 1717300, 2157191, 2708050, 3363326,
+    4194304, 5237765, 6557202, 8165337, 10153587,
+    12820798, 15790321, 19976592, 24970740, 31350126,
+    39045157, 49367440, 61356676, 76695844, 95443717,
+    119304647, 148102320, 186737708, 238609294, 286331153,
+)
+
+class LegacyAccounting:
+    """The simulator's original accounting: weight 1024 // (1 + nice) (see nice_to_weight), float ms vruntime."""
+    name = 'legacy'
+
+    def weight(self, niceValue):
+        return nice_to_weight(niceValue)
+
+    def to_time(self, ms):
+        return ms
+
+    def delta_fair(self, delta_exec, weight):
+        return delta_exec * (1024 / weight)
+
+    def rescale(self, lag, old_weight, new_weight):
+        return lag * old_weight / new_weight
+
+class KernelAccounting:
+    """Kernel-accurate accounting: table weights and integer nanosecond vruntime.
+
+    delta_fair() reproduces the kernel's __calc_delta(delta, NICE_0_LOAD, lw):
+    a multiply by the inverse weight and a right shift, with the same
+    normalization of the 64-bit factor, so results are bit-identical to the
+    kernel and never touch floating point (NICE_0_LOAD needs no fast path: its
+    factor reduces to an exact identity). The factor and shift are computed
+    once per weight.
+
+    This buys reproducibility and kernel fidelity, not speed: in CPython the
+    integer multiply-shift and ns conversion cost slightly more per tick than
+    the legacy float division, so headless runs are on par with, and often up
+    to ~10% slower than, LEGACY_ACCOUNTING (see `cfsBenchmark.py accounting`).
+    """
+    name = 'kernel'
+
+    def __init__(self):
+        self._factors = {}
+        for weight in SCHED_PRIO_TO_WEIGHT:
+            self._factor(weight)
+
+    def weight(self, niceValue):
+        if not -20 <= niceValue <= 19:
+            raise ValueError(f"nice value {niceValue} outside -20..19")
+        return SCHED_PRIO_TO_WEIGHT[niceValue + 20]
+
+    def to_time(self, ms):
+        return int(ms * 1000000)
+
+    def inv_weight(self, weight):
+        if weight in SCHED_PRIO_TO_WEIGHT:
+            return SCHED_PRIO_TO_WMULT[SCHED_PRIO_TO_WEIGHT.index(weight)]
+        return WMULT_CONST // weight
+
+    def _factor(self, weight):
+        fact = NICE_0_LOAD * self.inv_weight(weight)
+        shift = WMULT_SHIFT
+        fact_hi = fact >> 32
+        if fact_hi:
+            fs = fact_hi.bit_length()
+            shift -= fs
+            fact >>= fs
+        self._factors[weight] = (fact, shift)
+        return fact, shift
+
+    def delta_fair(self, delta_exec, weight):
+        try:
+            fact, shift = self._factors[weight]
+        except KeyError:
+            fact, shift = self._factor(weight)
+        return (delta_exec * fact) >> shift
+
+    def rescale(self, lag, old_weight, new_weight):
+        return lag * old_weight // new_weight
+
+LEGACY_ACCOUNTING = LegacyAccounting()
+KERNEL_ACCOUNTING = KernelAccounting()
+ACCOUNTING = {'legacy': LEGACY_ACCOUNTING, 'kernel': KERNEL_ACCOUNTING}
 
 class Node:
-    def __init__(self, PID, niceValue=0, vruntime=0, dealtExec=0, timeToExec=10):
+    __slots__ = ('color', 'PID', 'niceValue', 'weight', 'vruntime', 'dealtExec', 'timeToExec',
+                 'left', 'right', 'parent')
+
+    def __init__(self, PID, niceValue=0, vruntime=0, dealtExec=0, timeToExec=10, weight=None):
         self.color = 1
         self.PID = PID
         self.niceValue = niceValue
-        self.weight = 1024 // (1 + niceValue)
+        self.weight = weight # None: set from niceValue by the runqueue's accounting on insert
         self.vruntime = vruntime
         self.dealtExec = dealtExec
         self.timeToExec = timeToExec
@@ -14,11 +147,121 @@ class Node:
         self.right = None
         self.parent = None
 
-class RedBlackTree:
-    def __init__(self):
+class RunQueue(ABC):
+    """Interface shared by the CFS runqueue backends.
+
+    A backend orders queued Nodes by vruntime (FIFO among equal keys) and
+    implements insert, delete_node, pick_next and requeue. The PID index,
+    weighted load and the renice / sleep / wake / kill operations built on top
+    of those four live here, so every backend supports them. `accounting`
+    (LEGACY_ACCOUNTING by default) supplies the weights used by renice.
+    """
+    def __init__(self, accounting=None):
+        self.accounting = accounting or LEGACY_ACCOUNTING
+        self.min_vruntime = 0
+        self.load = 0        # sum of the weights of queued tasks
+        self.tasks = {}      # PID -> queued (runnable) node
+        self.sleeping = {}   # PID -> dequeued, blocked node
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @abstractmethod
+    def insert(self, node):
+        ...
+
+    @abstractmethod
+    def delete_node(self, node):
+        ...
+
+    @abstractmethod
+    def pick_next(self):
+        """Return the queued task with the smallest vruntime without dequeuing it, or None."""
+
+    def requeue(self, node, new_vruntime):
+        """Move a queued node to `new_vruntime`."""
+        self.delete_node(node)
+        node.vruntime = new_vruntime
+        self.insert(node)
+
+    def delete_min(self):
+        node = self.pick_next()
+        self.delete_node(node)
+        return node
+
+    def time_slice(self, node, tunables):
+        """How long `node` runs once picked; CFS gives it its weight's share of the period."""
+        return tunables.time_slice(node, self)
+
+    def wakeup_preempt(self, curr, woken, tunables):
+        """Whether waking `woken` should cut the running task `curr` short."""
+        return tunables.wakeup_preempt(curr, woken)
+
+    def update_min_vruntime(self):
+        """Advance the monotonic min_vruntime to the leftmost task and return it."""
+        node = self.pick_next()
+        if node is not None and node.vruntime > self.min_vruntime:
+            self.min_vruntime = node.vruntime
+        return self.min_vruntime
+
+    def find(self, PID):
+        """Return the runnable or sleeping node with this PID, or None."""
+        node = self.tasks.get(PID)
+        if node is None:
+            node = self.sleeping.get(PID)
+        return node
+
+    def renice(self, PID, niceValue):
+        """Change a task's nice value and weight.
+
+        A runnable task keeps its weighted distance from min_vruntime: its lead or
+        lag is scaled by old_weight / new_weight and the node is requeued there.
+        """
+        node = self.find(PID)
+        if node is None:
+            raise KeyError(PID)
+        weight = self.accounting.weight(niceValue)
+        if PID in self.tasks:
+            base = self.update_min_vruntime()
+            self.requeue(node, base + self.accounting.rescale(node.vruntime - base, node.weight, weight))
+            self.load += weight - node.weight
+        node.niceValue = niceValue
+        node.weight = weight
+        return node
+
+    def sleep(self, PID):
+        """Dequeue a runnable task that blocks; it keeps its vruntime while asleep."""
+        node = self.tasks[PID]
+        self.update_min_vruntime()
+        self.delete_node(node)
+        self.sleeping[PID] = node
+        return node
+
+    def wake(self, PID):
+        """Enqueue a sleeping task, never placing it before min_vruntime."""
+        node = self.sleeping.pop(PID)
+        base = self.update_min_vruntime()
+        if node.vruntime < base:
+            node.vruntime = base
+        self.insert(node)
+        return node
+
+    def kill(self, PID):
+        """Remove a runnable or sleeping task for good and return its node."""
+        node = self.sleeping.pop(PID, None)
+        if node is None:
+            node = self.tasks[PID]
+            self.update_min_vruntime()
+            self.delete_node(node)
+        return node
+
+class RedBlackTree(RunQueue):
+    def __init__(self, accounting=None):
+        super().__init__(accounting)
         self.TNULL = Node(0)
         self.TNULL.color = 0
         self.root = self.TNULL
+        self.leftmost = self.TNULL
 
     def left_rotate(self, x):
         y = x.right
@@ -51,17 +294,28 @@ class RedBlackTree:
         x.parent = y
 
     def insert(self, node):
+        if node.PID in self.tasks or node.PID in self.sleeping:
+            raise ValueError(f"PID {node.PID} is already queued or asleep")
+        if node.weight is None:
+            node.weight = self.accounting.weight(node.niceValue)
+        self.tasks[node.PID] = node
+        self.load += node.weight
+        node.color = 1
         node.left = self.TNULL
         node.right = self.TNULL
         node.parent = None
         y = None
         x = self.root
+        leftmost = True
         while x != self.TNULL:
             y = x
             if node.vruntime < x.vruntime:
                 x = x.left
             else:
                 x = x.right
+                leftmost = False
+        if leftmost:
+            self.leftmost = node
         node.parent = y
         if y == None:
             self.root = node
@@ -115,12 +369,70 @@ class RedBlackTree:
             node = node.left
         return node
 
+    def successor(self, node):
+        if node.right != self.TNULL:
+            return self.minimum(node.right)
+        p = node.parent
+        while p is not None and node == p.right:
+            node = p
+            p = p.parent
+        return p
+
+    def predecessor(self, node):
+        if node.left != self.TNULL:
+            node = node.left
+            while node.right != self.TNULL:
+                node = node.right
+            return node
+        p = node.parent
+        while p is not None and node == p.left:
+            node = p
+            p = p.parent
+        return p
+
+    def pick_next(self):
+        """Return the task with the smallest vruntime without dequeuing it (O(1))."""
+        if self.leftmost == self.TNULL:
+            return None
+        return self.leftmost
+
+    def requeue(self, node, new_vruntime):
+        """Move a queued node to `new_vruntime`.
+
+        The key is updated in place when the node's in-order neighbours still bracket
+        the new value, which is the common case for the task that just ran while it
+        stays leftmost; otherwise the node is unlinked and reinserted.
+        """
+        if node is self.leftmost:
+            nxt = self.successor(node)
+            if nxt is None or new_vruntime < nxt.vruntime:
+                node.vruntime = new_vruntime
+                return
+            # The successor becomes leftmost; delete_node need not search for it again
+            self.leftmost = nxt
+        else:
+            prev = self.predecessor(node)
+            if prev.vruntime <= new_vruntime:
+                nxt = self.successor(node)
+                if nxt is None or new_vruntime < nxt.vruntime:
+                    node.vruntime = new_vruntime
+                    return
+        self.delete_node(node)
+        node.vruntime = new_vruntime
+        self.insert(node)
+
     def delete_min(self):
-        min_node = self.minimum(self.root)
+        min_node = self.leftmost
         self.delete_node(min_node)
         return min_node
 
     def delete_node(self, node):
+        del self.tasks[node.PID]
+        self.load -= node.weight
+        if node == self.leftmost:
+            nxt = self.successor(node)
+            self.leftmost = self.TNULL if nxt is None else nxt
+
         def transplant(u, v):
             if u.parent == None:
                 self.root = v
@@ -151,6 +463,113 @@ class RedBlackTree:
             y.left = node.left
             y.left.parent = y
             y.color = node.color
+        if y_original_color == 0:
+            self.fix_delete(x)
+        self.TNULL.parent = None
+
+    def fix_delete(self, x):
+        while x != self.root and x.color == 0:
+            if x == x.parent.left:
+                w = x.parent.right
+                if w.color == 1:
+                    w.color = 0
+                    x.parent.color = 1
+                    self.left_rotate(x.parent)
+                    w = x.parent.right
+                if w.left.color == 0 and w.right.color == 0:
+                    w.color = 1
+                    x = x.parent
+                else:
+                    if w.right.color == 0:
+                        w.left.color = 0
+                        w.color = 1
+                        self.right_rotate(w)
+                        w = x.parent.right
+                    w.color = x.parent.color
+                    x.parent.color = 0
+                    w.right.color = 0
+                    self.left_rotate(x.parent)
+                    x = self.root
+            else:
+                w = x.parent.left
+                if w.color == 1:
+                    w.color = 0
+                    x.parent.color = 1
+                    self.right_rotate(x.parent)
+                    w = x.parent.left
+                if w.right.color == 0 and w.left.color == 0:
+                    w.color = 1
+                    x = x.parent
+                else:
+                    if w.left.color == 0:
+                        w.right.color = 0
+                        w.color = 1
+                        self.left_rotate(w)
+                        w = x.parent.left
+                    w.color = x.parent.color
+                    x.parent.color = 0
+                    w.left.color = 0
+                    self.right_rotate(x.parent)
+                    x = self.root
+        x.color = 0
+
+    def height(self):
+        """Number of nodes on the longest root-to-leaf path."""
+        best = 0
+        stack = [(self.root, 1)] if self.root != self.TNULL else []
+        while stack:
+            node, depth = stack.pop()
+            if depth > best:
+                best = depth
+            if node.left != self.TNULL:
+                stack.append((node.left, depth + 1))
+            if node.right != self.TNULL:
+                stack.append((node.right, depth + 1))
+        return best
+
+    def check_invariants(self):
+        """Validate the red-black and ordering invariants and return the black height.
+
+        Raises ValueError describing the first violation found. Runs in O(n) without
+        recursion, so it also works on trees that have already degenerated.
+        """
+        TNULL = self.TNULL
+        if self.root != TNULL and (self.root.color != 0 or self.root.parent is not None):
+            raise ValueError("root must be black and have no parent")
+        if TNULL.color != 0:
+            raise ValueError("sentinel must be black")
+        black_height = None
+        count = 0
+        stack = [(self.root, 0, None, None)]
+        while stack:
+            node, blacks, low, high = stack.pop()
+            if node == TNULL:
+                if black_height is None:
+                    black_height = blacks
+                elif blacks != black_height:
+                    raise ValueError(f"unequal black heights {blacks} and {black_height}")
+                continue
+            if (low is not None and node.vruntime < low) or (high is not None and node.vruntime > high):
+                raise ValueError(f"P{node.PID} is out of vruntime order")
+            count += 1
+            if self.tasks.get(node.PID) is not node:
+                raise ValueError(f"P{node.PID} is missing from the PID index")
+            blacks += node.color == 0
+            for child in (node.left, node.right):
+                if child == TNULL:
+                    continue
+                if child.parent is not node:
+                    raise ValueError(f"P{child.PID} has a stale parent pointer")
+                if node.color == 1 and child.color == 1:
+                    raise ValueError(f"red P{node.PID} has red child P{child.PID}")
+            stack.append((node.right, blacks, node.vruntime, high))
+            stack.append((node.left, blacks, low, node.vruntime))
+        if count != len(self.tasks):
+            raise ValueError(f"PID index holds {len(self.tasks)} tasks but the tree has {count}")
+        expected = self.minimum(self.root) if self.root != TNULL else TNULL
+        if self.leftmost is not expected:
+            raise ValueError("cached leftmost is not the minimum node")
+        return black_height
 
     def print_tree(self, node=None, indent="", last=True):
         if node is None:
@@ -160,33 +579,1966 @@ class RedBlackTree:
             self.print_tree(node.left, indent + ("    " if last else "|   "), False)
             self.print_tree(node.right, indent + ("    " if last else "|   "), True)
 
-if __name__ == "__main__":
+class CompactRedBlackTree:
+    """Red-black runqueue that stores tasks in parallel arrays instead of Node objects.
+
+    Every task is an integer handle indexing the column arrays below; handle 0 is
+    the black sentinel (the TNULL of RedBlackTree). Released handles are chained
+    through `left` into a free-list and reused by later inserts, so a long running
+    simulation never grows the arrays past its peak number of queued tasks.
+    """
+    def __init__(self, capacity=0):
+        self.TNULL = 0
+        self.root = 0
+        self.leftmost = 0
+        self.size = 0
+        self.free = 0
+        self.color = bytearray(1)
+        self.PID = array('q', [0])
+        self.niceValue = array('h', [0])
+        self.weight = array('i', [0])
+        self.vruntime = array('d', [0.0])
+        self.dealtExec = array('d', [0.0])
+        self.timeToExec = array('d', [0.0])
+        self.left = array('i', [0])
+        self.right = array('i', [0])
+        self.parent = array('i', [0])
+        if capacity:
+            self.reserve(capacity)
+
+    def __len__(self):
+        return self.size
+
+    def reserve(self, capacity):
+        """Preallocate free handles so that `capacity` tasks fit without growing the arrays."""
+        start = len(self.PID)
+        extra = capacity - (start - 1)
+        if extra <= 0:
+            return
+        self.color.extend(bytes(extra))
+        for column in (self.PID, self.niceValue, self.weight, self.vruntime, self.dealtExec,
+                       self.timeToExec, self.left, self.right, self.parent):
+            column.extend(array(column.typecode, [0]) * extra)
+        # Chain the new slots in ascending order in front of the existing free-list
+        left = self.left
+        end = start + extra
+        for h in range(start, end - 1):
+            left[h] = h + 1
+        left[end - 1] = self.free
+        self.free = start
+
+    def _allocate(self):
+        h = self.free
+        if h:
+            self.free = self.left[h]
+            return h
+        h = len(self.PID)
+        self.color.append(0)
+        self.PID.append(0)
+        self.niceValue.append(0)
+        self.weight.append(0)
+        self.vruntime.append(0.0)
+        self.dealtExec.append(0.0)
+        self.timeToExec.append(0.0)
+        self.left.append(0)
+        self.right.append(0)
+        self.parent.append(0)
+        return h
+
+    def _release(self, h):
+        self.left[h] = self.free
+        self.free = h
+
+    def insert_task(self, PID, niceValue=0, vruntime=0, dealtExec=0, timeToExec=10, weight=None):
+        """Queue a task given by its fields and return its handle."""
+        h = self._allocate()
+        self.PID[h] = PID
+        self.niceValue[h] = niceValue
+        self.weight[h] = nice_to_weight(niceValue) if weight is None else weight
+        self.vruntime[h] = vruntime
+        self.dealtExec[h] = dealtExec
+        self.timeToExec[h] = timeToExec
+        self._link(h)
+        return h
+
+    def insert(self, node):
+        """Queue a Node (or any object with the same fields) and return its handle."""
+        return self.insert_task(node.PID, node.niceValue, node.vruntime, node.dealtExec,
+                                node.timeToExec, node.weight)
+
+    def node(self, h):
+        """Materialize handle `h` as a standalone Node."""
+        node = Node(self.PID[h], self.niceValue[h], self.vruntime[h], self.dealtExec[h], self.timeToExec[h])
+        node.weight = self.weight[h]
+        return node
+
+    def left_rotate(self, x):
+        left, right, parent = self.left, self.right, self.parent
+        y = right[x]
+        right[x] = left[y]
+        if left[y]:
+            parent[left[y]] = x
+        p = parent[x]
+        parent[y] = p
+        if p == 0:
+            self.root = y
+        elif x == left[p]:
+            left[p] = y
+        else:
+            right[p] = y
+        left[y] = x
+        parent[x] = y
+
+    def right_rotate(self, x):
+        left, right, parent = self.left, self.right, self.parent
+        y = left[x]
+        left[x] = right[y]
+        if right[y]:
+            parent[right[y]] = x
+        p = parent[x]
+        parent[y] = p
+        if p == 0:
+            self.root = y
+        elif x == right[p]:
+            right[p] = y
+        else:
+            left[p] = y
+        right[y] = x
+        parent[x] = y
+
+    def _link(self, h):
+        left, right, parent, vruntime = self.left, self.right, self.parent, self.vruntime
+        key = vruntime[h]
+        left[h] = 0
+        right[h] = 0
+        y = 0
+        x = self.root
+        leftmost = True
+        while x:
+            y = x
+            if key < vruntime[x]:
+                x = left[x]
+            else:
+                x = right[x]
+                leftmost = False
+        if leftmost:
+            self.leftmost = h
+        parent[h] = y
+        if y == 0:
+            self.root = h
+        elif key < vruntime[y]:
+            left[y] = h
+        else:
+            right[y] = h
+        self.color[h] = 1
+        self.size += 1
+        self.fix_insert(h)
+
+    def fix_insert(self, k):
+        color, left, right, parent = self.color, self.left, self.right, self.parent
+        while color[parent[k]] == 1:
+            p = parent[k]
+            g = parent[p]
+            if p == right[g]:
+                u = left[g]
+                if color[u] == 1:
+                    color[u] = 0
+                    color[p] = 0
+                    color[g] = 1
+                    k = g
+                else:
+                    if k == left[p]:
+                        k = p
+                        self.right_rotate(k)
+                        p = parent[k]
+                    color[p] = 0
+                    color[g] = 1
+                    self.left_rotate(g)
+            else:
+                u = right[g]
+                if color[u] == 1:
+                    color[u] = 0
+                    color[p] = 0
+                    color[g] = 1
+                    k = g
+                else:
+                    if k == right[p]:
+                        k = p
+                        self.left_rotate(k)
+                        p = parent[k]
+                    color[p] = 0
+                    color[g] = 1
+                    self.right_rotate(g)
+        color[self.root] = 0
+
+    def minimum(self, h):
+        left = self.left
+        while left[h]:
+            h = left[h]
+        return h
+
+    def successor(self, h):
+        right, parent = self.right, self.parent
+        if right[h]:
+            return self.minimum(right[h])
+        p = parent[h]
+        while p and h == right[p]:
+            h = p
+            p = parent[p]
+        return p
+
+    def predecessor(self, h):
+        left, right, parent = self.left, self.right, self.parent
+        if left[h]:
+            h = left[h]
+            while right[h]:
+                h = right[h]
+            return h
+        p = parent[h]
+        while p and h == left[p]:
+            h = p
+            p = parent[p]
+        return p
+
+    def pick_next(self):
+        """Return the handle with the smallest vruntime (0 when empty) without dequeuing it."""
+        return self.leftmost
+
+    def requeue(self, h, new_vruntime):
+        """Move handle `h` to `new_vruntime`, in place when its neighbours allow it."""
+        vruntime = self.vruntime
+        if h == self.leftmost:
+            nxt = self.successor(h)
+            if nxt == 0 or new_vruntime < vruntime[nxt]:
+                vruntime[h] = new_vruntime
+                return
+            self.leftmost = nxt
+        else:
+            prev = self.predecessor(h)
+            if vruntime[prev] <= new_vruntime:
+                nxt = self.successor(h)
+                if nxt == 0 or new_vruntime < vruntime[nxt]:
+                    vruntime[h] = new_vruntime
+                    return
+        self._unlink(h)
+        vruntime[h] = new_vruntime
+        self._link(h)
+
+    def delete_min(self):
+        """Dequeue the leftmost task and return it as a Node, or None if the tree is empty."""
+        h = self.leftmost
+        if not h:
+            return None
+        node = self.node(h)
+        self.delete_node(h)
+        return node
+
+    def delete_node(self, z):
+        """Unlink handle `z` from the tree and return it to the free-list."""
+        if not z:
+            raise ValueError("cannot delete the sentinel handle 0")
+        self._unlink(z)
+        self._release(z)
+
+    def _unlink(self, z):
+        color, left, right, parent = self.color, self.left, self.right, self.parent
+        if z == self.leftmost:
+            self.leftmost = self.successor(z)
+
+        def transplant(u, v):
+            p = parent[u]
+            if p == 0:
+                self.root = v
+            elif u == left[p]:
+                left[p] = v
+            else:
+                right[p] = v
+            parent[v] = p
+
+        y_original_color = color[z]
+        if left[z] == 0:
+            x = right[z]
+            transplant(z, x)
+        elif right[z] == 0:
+            x = left[z]
+            transplant(z, x)
+        else:
+            y = self.minimum(right[z])
+            y_original_color = color[y]
+            x = right[y]
+            if parent[y] == z:
+                parent[x] = y
+            else:
+                transplant(y, x)
+                right[y] = right[z]
+                parent[right[y]] = y
+            transplant(z, y)
+            left[y] = left[z]
+            parent[left[y]] = y
+            color[y] = color[z]
+        if y_original_color == 0:
+            self.fix_delete(x)
+        parent[0] = 0
+        self.size -= 1
+
+    def fix_delete(self, x):
+        color, left, right, parent = self.color, self.left, self.right, self.parent
+        while x != self.root and color[x] == 0:
+            p = parent[x]
+            if x == left[p]:
+                w = right[p]
+                if color[w] == 1:
+                    color[w] = 0
+                    color[p] = 1
+                    self.left_rotate(p)
+                    w = right[p]
+                if color[left[w]] == 0 and color[right[w]] == 0:
+                    color[w] = 1
+                    x = p
+                else:
+                    if color[right[w]] == 0:
+                        color[left[w]] = 0
+                        color[w] = 1
+                        self.right_rotate(w)
+                        w = right[p]
+                    color[w] = color[p]
+                    color[p] = 0
+                    color[right[w]] = 0
+                    self.left_rotate(p)
+                    x = self.root
+            else:
+                w = left[p]
+                if color[w] == 1:
+                    color[w] = 0
+                    color[p] = 1
+                    self.right_rotate(p)
+                    w = left[p]
+                if color[left[w]] == 0 and color[right[w]] == 0:
+                    color[w] = 1
+                    x = p
+                else:
+                    if color[left[w]] == 0:
+                        color[right[w]] = 0
+                        color[w] = 1
+                        self.left_rotate(w)
+                        w = left[p]
+                    color[w] = color[p]
+                    color[p] = 0
+                    color[left[w]] = 0
+                    self.right_rotate(p)
+                    x = self.root
+        color[x] = 0
+
+    def print_tree(self, h=None, indent="", last=True):
+        if h is None:
+            h = self.root
+        if h:
+            print(indent, "`-- " if last else "|-- ", f"P{self.PID[h]} v={self.vruntime[h]:.2f} w={self.weight[h]} t={self.timeToExec[h]:.2f}", sep="")
+            self.print_tree(self.left[h], indent + ("    " if last else "|   "), False)
+            self.print_tree(self.right[h], indent + ("    " if last else "|   "), True)
+
+class HeapRunQueue(RunQueue):
+    """Binary heap runqueue with lazy deletion.
+
+    Heap entries are [vruntime, seq, node]; removing a task only blanks its entry,
+    and blanked entries are discarded when they reach the top or when they make
+    up more than half of the heap.
+    """
+    def __init__(self, accounting=None):
+        super().__init__(accounting)
+        self.heap = []
+        self.entries = {}  # PID -> live heap entry
+        self.seq = count()
+
+    def insert(self, node):
+        if node.PID in self.tasks or node.PID in self.sleeping:
+            raise ValueError(f"PID {node.PID} is already queued or asleep")
+        if node.weight is None:
+            node.weight = self.accounting.weight(node.niceValue)
+        self.tasks[node.PID] = node
+        self.load += node.weight
+        entry = [node.vruntime, next(self.seq), node]
+        self.entries[node.PID] = entry
+        heapq.heappush(self.heap, entry)
+
+    def delete_node(self, node):
+        del self.tasks[node.PID]
+        self.load -= node.weight
+        self.entries.pop(node.PID)[2] = None
+        self._compact()
+
+    def _compact(self):
+        """Rebuild the heap without blanked entries once they are more than half of it."""
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [entry for entry in self.heap if entry[2] is not None]
+            heapq.heapify(self.heap)
+
+    def pick_next(self):
+        heap = self.heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def requeue(self, node, new_vruntime):
+        heap = self.heap
+        entry = self.entries[node.PID]
+        node.vruntime = new_vruntime
+        new_entry = [new_vruntime, next(self.seq), node]
+        self.entries[node.PID] = new_entry
+        if heap[0] is entry:
+            # The task that just ran is on top: sift the new entry down in one step
+            heapq.heapreplace(heap, new_entry)
+        else:
+            entry[2] = None
+            heapq.heappush(heap, new_entry)
+            self._compact()
+
+class SkipNode:
+    __slots__ = ('key', 'seq', 'node', 'forward')
+
+    def __init__(self, key, seq, node, level):
+        self.key = key
+        self.seq = seq
+        self.node = node
+        self.forward = [None] * level
+
+class SkipListRunQueue(RunQueue):
+    """Skip list runqueue ordered by (vruntime, insertion sequence)."""
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self, rng=None, accounting=None):
+        super().__init__(accounting)
+        self.head = SkipNode(None, None, None, self.MAX_LEVEL)
+        self.level = 1
+        self.entries = {}  # PID -> SkipNode
+        self.seq = count()
+        self.random = (rng or random.Random()).random
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and self.random() < self.P:
+            level += 1
+        return level
+
+    def _predecessors(self, key, seq):
+        update = [self.head] * self.MAX_LEVEL
+        x = self.head
+        for i in range(self.level - 1, -1, -1):
+            nxt = x.forward[i]
+            while nxt is not None and (nxt.key < key or (nxt.key == key and nxt.seq < seq)):
+                x = nxt
+                nxt = x.forward[i]
+            update[i] = x
+        return update
+
+    def insert(self, node):
+        if node.PID in self.tasks or node.PID in self.sleeping:
+            raise ValueError(f"PID {node.PID} is already queued or asleep")
+        if node.weight is None:
+            node.weight = self.accounting.weight(node.niceValue)
+        self.tasks[node.PID] = node
+        self.load += node.weight
+        self._link(node)
+
+    def _link(self, node):
+        seq = next(self.seq)
+        update = self._predecessors(node.vruntime, seq)
+        level = self._random_level()
+        if level > self.level:
+            self.level = level
+        entry = SkipNode(node.vruntime, seq, node, level)
+        for i in range(level):
+            entry.forward[i] = update[i].forward[i]
+            update[i].forward[i] = entry
+        self.entries[node.PID] = entry
+
+    def delete_node(self, node):
+        del self.tasks[node.PID]
+        self.load -= node.weight
+        self._unlink(node)
+
+    def _unlink(self, node):
+        entry = self.entries.pop(node.PID)
+        update = self._predecessors(entry.key, entry.seq)
+        for i in range(len(entry.forward)):
+            update[i].forward[i] = entry.forward[i]
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+
+    def pick_next(self):
+        first = self.head.forward[0]
+        return first.node if first is not None else None
+
+    def requeue(self, node, new_vruntime):
+        entry = self.entries[node.PID]
+        if entry is self.head.forward[0]:
+            nxt = entry.forward[0]
+            if nxt is None or new_vruntime < nxt.key:
+                entry.key = node.vruntime = new_vruntime
+                return
+        self._unlink(node)
+        node.vruntime = new_vruntime
+        self._link(node)
+
+class TimingWheelRunQueue(RunQueue):
+    """Bucketed timing wheel keyed by vruntime.
+
+    Slot i of the wheel holds the tasks whose vruntime falls in bucket
+    base + i (modulo the wheel size), kept sorted with bisect. Tasks beyond the
+    wheel's horizon wait in an overflow heap and move onto the wheel as the
+    cursor advances; tasks behind the cursor are clamped into its slot.
+    `granularity` is the bucket width in vruntime units; it defaults to 1 ms in
+    the accounting's time unit.
+    """
+    def __init__(self, granularity=None, slots=1024, accounting=None):
+        super().__init__(accounting)
+        self.granularity = self.accounting.to_time(1.0) if granularity is None else granularity
+        self.slots = slots
+        self.wheel = [[] for _ in range(slots)]
+        self.on_wheel = 0
+        self.base = 0               # bucket number under the cursor
+        self.overflow = []          # heap of (bucket, item) beyond the horizon
+        self.entries = {}           # PID -> (item, slot or -1 when in overflow)
+        self.seq = count()
+
+    def _place(self, item):
+        bucket = int(item[0] // self.granularity)
+        if bucket < self.base:
+            bucket = self.base
+        if bucket >= self.base + self.slots:
+            heapq.heappush(self.overflow, (bucket, item))
+            self.entries[item[2].PID] = (item, -1)
+        else:
+            slot = bucket % self.slots
+            insort(self.wheel[slot], item)
+            self.on_wheel += 1
+            self.entries[item[2].PID] = (item, slot)
+
+    def _remove(self, node):
+        item, slot = self.entries.pop(node.PID)
+        if slot >= 0:
+            bucket = self.wheel[slot]
+            del bucket[bisect_left(bucket, item)]
+            self.on_wheel -= 1
+        # Overflow entries are dropped lazily once the cursor reaches them
+
+    def insert(self, node):
+        if node.PID in self.tasks or node.PID in self.sleeping:
+            raise ValueError(f"PID {node.PID} is already queued or asleep")
+        if node.weight is None:
+            node.weight = self.accounting.weight(node.niceValue)
+        self.tasks[node.PID] = node
+        self.load += node.weight
+        self._place((node.vruntime, next(self.seq), node))
+
+    def delete_node(self, node):
+        del self.tasks[node.PID]
+        self.load -= node.weight
+        self._remove(node)
+
+    def _advance(self):
+        """Move the cursor to the first non-empty slot, refilling from overflow."""
+        wheel, slots, entries, overflow = self.wheel, self.slots, self.entries, self.overflow
+        while True:
+            if self.on_wheel:
+                while not wheel[self.base % slots]:
+                    self.base += 1
+                horizon = self.base + slots
+            else:
+                # Drop stale overflow entries, then jump the cursor to the earliest live one
+                while overflow and entries.get(overflow[0][1][2].PID, (None,))[0] is not overflow[0][1]:
+                    heapq.heappop(overflow)
+                if not overflow:
+                    return None
+                self.base = overflow[0][0]
+                horizon = self.base + slots
+            while overflow and overflow[0][0] < horizon:
+                _, item = heapq.heappop(overflow)
+                if entries.get(item[2].PID, (None,))[0] is item:
+                    self._place(item)
+            if self.on_wheel:
+                bucket = wheel[self.base % slots]
+                if bucket:
+                    return bucket[0][2]
+
+    def pick_next(self):
+        bucket = self.wheel[self.base % self.slots]
+        if bucket:
+            return bucket[0][2]
+        if not self.tasks:
+            return None
+        return self._advance()
+
+    def requeue(self, node, new_vruntime):
+        self._remove(node)
+        node.vruntime = new_vruntime
+        self._place((new_vruntime, next(self.seq), node))
+
+BACKENDS = {
+    'rbtree': RedBlackTree,
+    'heap': HeapRunQueue,
+    'skiplist': SkipListRunQueue,
+    'wheel': TimingWheelRunQueue,
+}
+
+def jain_index(values):
+    """Jain's fairness index: 1.0 when all values are equal, 1/n at worst."""
+    total = sum(values)
+    squares = sum(v * v for v in values)
+    if not squares:
+        return 1.0
+    return total * total / (len(values) * squares)
+
+class P2Quantile:
+    """Streaming estimate of the q-quantile in O(1) time and space (Jain and
+    Chlamtac's P-square algorithm): five markers track the minimum, q/2, q,
+    (1+q)/2 and maximum, nudged by piecewise-parabolic interpolation. Accurate
+    on long, roughly stationary series; a distribution that drifts within a
+    short run (waits shrinking as tasks finish) can leave the markers behind."""
+    __slots__ = ('q', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, q):
+        self.q = q
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        h = self.heights
+        if len(h) < 5:
+            insort(h, x)
+            return
+        n = self.positions
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = bisect_right(h, x) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self.desired
+        for i, step in enumerate(self.increments):
+            desired[i] += step
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = h[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1]))
+                if not h[i - 1] < height < h[i + 1]:
+                    height = h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+                h[i] = height
+                n[i] += d
+
+    def value(self):
+        h = self.heights
+        if len(h) < 5:
+            return h[min(len(h) - 1, int(self.q * len(h)))] if h else 0.0
+        return h[2]
+
+class LatencyStats:
+    """Count, mean, max and streaming quantiles of a latency series."""
+    __slots__ = ('count', 'total', 'max', 'quantiles')
+
+    def __init__(self, quantiles=(0.5, 0.9, 0.99)):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.quantiles = [P2Quantile(q) for q in quantiles]
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        if x > self.max:
+            self.max = x
+        for sketch in self.quantiles:
+            sketch.add(x)
+
+    def summary(self):
+        result = {'count': self.count, 'mean': self.total / self.count if self.count else 0.0, 'max': self.max}
+        for sketch in self.quantiles:
+            result[f"p{sketch.q * 100:g}"] = sketch.value()
+        return result
+
+class SchedStats:
+    """Per-task scheduling statistics collected from simulator events.
+
+    Each event costs O(1). A task's weight-entitled CPU time is the integral of
+    weight / W(t) over the time it is runnable, where W is the total runnable
+    weight: a global integral of dt / W is kept, and each task remembers its
+    value when it became runnable. Wait is the time from becoming runnable
+    (arrival, wakeup or the end of its last slice) to being picked. Finished
+    tasks are folded into running totals and forgotten, so memory follows the
+    live tasks. Fairness is Jain's index over received / entitled CPU time.
+    With `sample_interval` set, summary() is appended to `samples` every time
+    the clock crosses another interval; a summary costs O(live tasks).
+    """
+    def __init__(self, quantiles=(0.5, 0.9, 0.99), sample_interval=None):
+        self.wait = LatencyStats(quantiles)
+        self.turnaround = LatencyStats(quantiles)
+        self.live = {}  # PID -> [weight, arrival, ready_since, runnable_since, entitled, cpu, slices]
+        self.runnable_weight = 0
+        self.inverse_load = 0.0  # integral of dt / runnable_weight
+        self.clock = 0
+        self.slices = 0
+        self.cpu = 0
+        self.finished = 0
+        self.share_sum = 0.0
+        self.share_squares = 0.0
+        self.sample_interval = sample_interval
+        self.next_sample = sample_interval
+        self.samples = []
+
+    def advance(self, clock):
+        if self.runnable_weight:
+            self.inverse_load += (clock - self.clock) / self.runnable_weight
+        self.clock = clock
+        if self.next_sample is not None and clock >= self.next_sample:
+            self.samples.append(self.summary())
+            while self.next_sample <= clock:
+                self.next_sample += self.sample_interval
+
+    def _runnable(self, task, since):
+        task[2] = since
+        task[3] = self.inverse_load
+        self.runnable_weight += task[0]
+
+    def _not_runnable(self, task):
+        task[4] += task[0] * (self.inverse_load - task[3])
+        task[2] = task[3] = None
+        self.runnable_weight -= task[0]
+
+    def arrive(self, PID, weight, clock, since=None):
+        """`PID` arrived; `since` is its arrival time when that was earlier than `clock`
+        (during a slice that has just ended), and counts towards wait and turnaround."""
+        self.advance(clock)
+        since = clock if since is None else since
+        task = self.live[PID] = [weight, since, None, None, 0.0, 0, 0]
+        self._runnable(task, since)
+
+    def run(self, PID, clock, delta_exec):
+        """`PID` was picked at `clock` and ran for delta_exec."""
+        self.advance(clock)
+        task = self.live[PID]
+        self.wait.add(clock - task[2])
+        task[2] = clock + delta_exec
+        task[5] += delta_exec
+        task[6] += 1
+        self.slices += 1
+        self.cpu += delta_exec
+
+    def block(self, PID, clock):
+        self.advance(clock)
+        self._not_runnable(self.live[PID])
+
+    def wake(self, PID, clock, since=None):
+        """`PID` woke up; `since` is as for arrive()."""
+        self.advance(clock)
+        self._runnable(self.live[PID], clock if since is None else since)
+
+    def finish(self, PID, clock):
+        self.advance(clock)
+        task = self.live.pop(PID)
+        self._not_runnable(task)
+        self.turnaround.add(clock - task[1])
+        self.finished += 1
+        if task[4]:
+            share = task[5] / task[4]
+            self.share_sum += share
+            self.share_squares += share * share
+
+    def task(self, PID):
+        """Statistics for a live task."""
+        weight, arrival, ready_since, runnable_since, entitled, cpu, slices = self.live[PID]
+        if runnable_since is not None:
+            entitled += weight * (self.inverse_load - runnable_since)
+        return {'weight': weight, 'arrival': arrival, 'cpu': cpu, 'entitled': entitled,
+                'share': cpu / entitled if entitled else 0.0, 'slices': slices}
+
+    def summary(self):
+        count = self.finished
+        total = self.share_sum
+        squares = self.share_squares
+        for PID in self.live:
+            entitled = self.task(PID)['entitled']
+            if entitled:
+                share = self.live[PID][5] / entitled
+                count += 1
+                total += share
+                squares += share * share
+        return {
+            'clock': self.clock,
+            'live': len(self.live),
+            'finished': self.finished,
+            'slices': self.slices,
+            'cpu': self.cpu,
+            'wait': self.wait.summary(),
+            'turnaround': self.turnaround.summary(),
+            'fairness': total * total / (count * squares) if squares else 1.0,
+        }
+
+class CPU:
+    """One simulated core: its own runqueue plus time accounting."""
+    def __init__(self, cpu_id, runqueue=RedBlackTree, accounting=None):
+        self.cpu_id = cpu_id
+        self.tree = runqueue(accounting=accounting)
+        self.clock = 0.0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.migration_overhead = 0.0
+        self.migrations_in = 0
+        self.completed = 0
+
+class MultiCoreSimulator:
+    """CFS on N cores with one RedBlackTree per core.
+
+    Cores advance independently; the core with the earliest clock always runs next.
+    Every `balance_interval` ms the busiest cores push weighted load to the idlest
+    ones when the busier load exceeds the idler one by more than `imbalance_pct`
+    percent, and a core that runs out of work immediately tries to pull from the
+    busiest core (idle balancing). Cache-hot tasks and tasks that have not run
+    since they last moved are not migrated (can_migrate). Each migration costs
+    the destination core `migration_cost` ms of lost time, and the task's vruntime is renormalized
+    from the source core's min_vruntime to the destination's. All times are
+    given in ms and converted to the accounting's unit (ns for KERNEL_ACCOUNTING).
+    """
+    def __init__(self, cpus=4, balance_interval=4.0, migration_cost=0.5, idle_step=1.0,
+                 max_pull=32, imbalance_pct=125, runqueue=RedBlackTree, accounting=None, rng=None):
+        self.accounting = accounting or LEGACY_ACCOUNTING
+        self.cpus = [CPU(i, runqueue, self.accounting) for i in range(cpus)]
+        to_time = self.accounting.to_time
+        self.balance_interval = to_time(balance_interval)
+        self.migration_cost = to_time(migration_cost)
+        self.idle_step = to_time(idle_step)
+        self.max_pull = max_pull
+        self.imbalance_pct = imbalance_pct
+        self.rng = rng or random.Random()
+        self.next_balance = self.balance_interval
+        self.migrations = 0
+        self.arrival = {}
+        self.last_ran = {}     # PID -> its core's clock at the end of its last slice
+        self.unsettled = set() # PIDs that have not run since they last migrated
+        self.finished = []  # (PID, weight, dealtExec, turnaround)
+
+    def nr_running(self):
+        return sum(len(cpu.tree) for cpu in self.cpus)
+
+    def add_task(self, node):
+        """Enqueue a new task on the least loaded core at that core's min_vruntime."""
+        cpu = min(self.cpus, key=lambda c: c.tree.load)
+        base = cpu.tree.update_min_vruntime()
+        if node.vruntime < base:
+            node.vruntime = base
+        self.arrival[node.PID] = cpu.clock
+        cpu.tree.insert(node)
+        return cpu
+
+    def migrate(self, node, src, dst):
+        src_min = src.tree.update_min_vruntime()
+        src.tree.delete_node(node)
+        node.vruntime += dst.tree.update_min_vruntime() - src_min
+        dst.tree.insert(node)
+        dst.clock += self.migration_cost
+        dst.migration_overhead += self.migration_cost
+        dst.migrations_in += 1
+        self.migrations += 1
+        self.unsettled.add(node.PID)
+
+    def can_migrate(self, node, src, dst):
+        """Like the kernel's can_migrate_task(): leave cache-hot tasks, which ran on src
+        within the last migration_cost, and tasks that have not run since their
+        last migration, so balancing cannot keep bouncing a task that is not
+        getting CPU time anyway."""
+        if node.PID in self.unsettled:
+            return False
+        last_ran = self.last_ran.get(node.PID)
+        return last_ran is None or src.clock - last_ran >= self.migration_cost
+
+    def _pull(self, dst, src):
+        """Move up to max_pull tasks from src to dst while each move shrinks their load difference."""
+        moved = 0
+        # Leave src's next task alone; it is the one most likely to be cache hot
+        skip = src.tree.pick_next()
+        for node in list(islice(src.tree.tasks.values(), self.max_pull)):
+            if len(src.tree) < 2 or src.tree.load * 100 <= dst.tree.load * self.imbalance_pct:
+                break
+            if node is skip or not self.can_migrate(node, src, dst):
+                continue
+            if 2 * node.weight < src.tree.load - dst.tree.load:
+                self.migrate(node, src, dst)
+                moved += 1
+        return moved
+
+    def idle_balance(self, cpu):
+        busiest = max(self.cpus, key=lambda c: c.tree.load)
+        if busiest is cpu or len(busiest.tree) < 2:
+            return 0
+        return self._pull(cpu, busiest)
+
+    def load_balance(self):
+        """Pair the busiest cores with the idlest ones and even out their weighted load."""
+        ranked = sorted(self.cpus, key=lambda c: c.tree.load)
+        moved = 0
+        for i in range(len(ranked) // 2):
+            moved += self._pull(ranked[i], ranked[-1 - i])
+        return moved
+
+    def run(self):
+        """Run until every queued task has finished and return the summary from stats()."""
+        rng = self.rng
+        to_time = self.accounting.to_time
+        delta_fair = self.accounting.delta_fair
+        cpus = self.cpus
+        heap = [(cpu.clock, cpu.cpu_id) for cpu in cpus]
+        heapq.heapify(heap)
+        remaining = self.nr_running()
+        while remaining:
+            clock, cpu_id = heapq.heappop(heap)
+            cpu = cpus[cpu_id]
+            if clock != cpu.clock:
+                # A migration charged this core while it was waiting in the heap
+                heapq.heappush(heap, (cpu.clock, cpu_id))
+                continue
+            if clock >= self.next_balance:
+                self.load_balance()
+                self.next_balance = clock + self.balance_interval
+            tree = cpu.tree
+            if not len(tree):
+                self.idle_balance(cpu)
+            if not len(tree):
+                cpu.idle += self.idle_step
+                cpu.clock += self.idle_step
+            else:
+                task = tree.pick_next()
+                delta_exec = to_time(rng.uniform(1, 5))
+                if delta_exec > task.timeToExec:
+                    delta_exec = task.timeToExec
+                task.dealtExec += delta_exec
+                task.timeToExec -= delta_exec
+                vruntime = task.vruntime + delta_fair(delta_exec, task.weight)
+                cpu.busy += delta_exec
+                cpu.clock += delta_exec
+                self.unsettled.discard(task.PID)
+                if task.timeToExec > 0:
+                    tree.requeue(task, vruntime)
+                    self.last_ran[task.PID] = cpu.clock
+                else:
+                    tree.delete_node(task)
+                    task.vruntime = vruntime
+                    cpu.completed += 1
+                    remaining -= 1
+                    self.last_ran.pop(task.PID, None)
+                    self.finished.append((task.PID, task.weight, task.dealtExec,
+                                          cpu.clock - self.arrival.pop(task.PID)))
+            heapq.heappush(heap, (cpu.clock, cpu_id))
+        return self.stats()
+
+    def stats(self):
+        makespan = max(cpu.clock for cpu in self.cpus) or 1.0
+        return {
+            'cpus': len(self.cpus),
+            'makespan': makespan,
+            'completed': len(self.finished),
+            'throughput': len(self.finished) / makespan,
+            'migrations': self.migrations,
+            'migration_overhead': sum(cpu.migration_overhead for cpu in self.cpus),
+            'utilization': [cpu.busy / makespan for cpu in self.cpus],
+            # Service rate per unit of weight; equal for every task under perfect fairness
+            'fairness': jain_index([dealt / turnaround / weight
+                                    for _, weight, dealt, turnaround in self.finished if turnaround]),
+        }
+
+def run_scenario(nice, timeToExec, deltas):
+    """Scalar reference for BatchSimulator: one scenario through RedBlackTree.
+
+    `deltas` supplies the requested run length of each tick in order. Returns the
+    same per-task statistics as BatchSimulator.run() does for one row.
+    """
     tree = RedBlackTree()
-    for pid in range(1, 7):
-        nice = random.randint(0, 10)
-        exec_time = random.uniform(10, 20)
-        task = Node(PID=pid, niceValue=nice, vruntime=0, timeToExec=exec_time)
-        tree.insert(task)
-    print("\nInitial Task Tree:")
-    tree.print_tree()
-    print("\n--- Starting Scheduling Simulation ---\n")
+    for i, (n, t) in enumerate(zip(nice, timeToExec)):
+        tree.insert(Node(PID=i, niceValue=n, timeToExec=t))
+    count = len(nice)
+    turnaround = [0.0] * count
+    finish_tick = [0] * count
+    slices = [0] * count
+    clock = 0.0
+    tick = 0
+    deltas = iter(deltas)
+    while len(tree):
+        tick += 1
+        task = tree.pick_next()
+        delta_exec = next(deltas)
+        if delta_exec > task.timeToExec:
+            delta_exec = task.timeToExec
+        task.dealtExec += delta_exec
+        task.timeToExec -= delta_exec
+        clock += delta_exec
+        slices[task.PID] += 1
+        vruntime = task.vruntime + delta_exec * (1024 / task.weight)
+        if task.timeToExec > 0:
+            tree.requeue(task, vruntime)
+        else:
+            tree.delete_node(task)
+            turnaround[task.PID] = clock
+            finish_tick[task.PID] = tick
+    return {'turnaround': turnaround, 'finish_tick': finish_tick, 'slices': slices, 'ticks': tick}
+
+class BatchSimulator:
+    """Advance many independent single-CPU CFS scenarios at once with NumPy.
+
+    Every row of the (scenarios, tasks) input arrays is one scenario. Each step
+    picks the runnable task with the smallest vruntime in every row (argmin; ties
+    go to the lowest index, which is the tree's FIFO order for tasks inserted in
+    index order) and charges it one slice, exactly like the scalar loop.
+    Finished tasks are keyed at +inf so they are never picked again.
+    """
+    def __init__(self, nice, timeToExec, rng=None):
+        if np is None:
+            raise ImportError("BatchSimulator requires NumPy")
+        nice = np.asarray(nice)
+        self.weight = nice_to_weight(nice)
+        self.timeToExec = np.array(timeToExec, dtype=np.float64)
+        scenarios, tasks = self.timeToExec.shape
+        self.vruntime = np.zeros((scenarios, tasks))
+        self.key = self.vruntime.copy()
+        self.key[self.timeToExec <= 0] = np.inf
+        self.dealtExec = np.zeros((scenarios, tasks))
+        self.slices = np.zeros((scenarios, tasks), dtype=np.int64)
+        self.turnaround = np.zeros((scenarios, tasks))
+        self.finish_tick = np.zeros((scenarios, tasks), dtype=np.int64)
+        self.clock = np.zeros(scenarios)
+        self.ticks = np.zeros(scenarios, dtype=np.int64)
+        self.rows = np.arange(scenarios)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def step(self, deltas=None):
+        """Run one slice in every unfinished scenario; return how many are still running."""
+        rows = self.rows
+        pick = self.key.argmin(axis=1)
+        live = np.isfinite(self.key[rows, pick])
+        if deltas is None:
+            deltas = self.rng.uniform(1, 5, len(rows))
+        remaining = self.timeToExec[rows, pick]
+        delta_exec = np.where(live, np.minimum(deltas, remaining), 0.0)
+        remaining = remaining - delta_exec
+        self.timeToExec[rows, pick] = remaining
+        self.dealtExec[rows, pick] += delta_exec
+        vruntime = self.vruntime[rows, pick] + delta_exec * (1024 / self.weight[rows, pick])
+        self.vruntime[rows, pick] = vruntime
+        self.clock += delta_exec
+        self.ticks += live
+        self.slices[rows, pick] += live
+        done = live & (remaining <= 0)
+        self.key[rows, pick] = np.where(live & ~done, vruntime, np.inf)
+        self.turnaround[rows[done], pick[done]] = self.clock[done]
+        self.finish_tick[rows[done], pick[done]] = self.ticks[done]
+        return int(np.count_nonzero(np.isfinite(self.key).any(axis=1)))
+
+    def run(self, deltas=None):
+        """Run every scenario to completion.
+
+        `deltas` optionally fixes the requested run lengths as a (ticks, scenarios)
+        array; row k is used for step k. Returns per-task turnaround, finish_tick
+        and slices arrays plus the per-scenario tick count.
+        """
+        step = 0
+        running = np.isfinite(self.key).any()
+        while running:
+            running = self.step(None if deltas is None else deltas[step])
+            step += 1
+        return {'turnaround': self.turnaround, 'finish_tick': self.finish_tick,
+                'slices': self.slices, 'ticks': self.ticks}
+
+EVENT_PICK = 0
+EVENT_RUN = 1
+EVENT_REQUEUE = 2
+EVENT_FINISH = 3
+EVENT_NAMES = ('pick', 'run', 'requeue', 'finish')
+
+TRACE_MAGIC = b'CFST'
+TRACE_HEADER = struct.Struct('<4sHIQ')  # magic, version, events stored, events recorded
+TRACE_COLUMNS = (('tick', 'q'), ('event', 'B'), ('PID', 'q'), ('vruntime', 'd'), ('value', 'd'))
+
+class TraceBuffer:
+    """Fixed-capacity ring buffer of scheduling events stored as typed columns.
+
+    Nothing is allocated per event; once full the oldest events are overwritten.
+    `value` carries the run length for run events, the remaining time for
+    requeue events and the total execution time for finish events.
+    """
+    def __init__(self, capacity=1 << 20):
+        self.capacity = capacity
+        self.head = 0
+        self.recorded = 0
+        self.tick = array('q', [0]) * capacity
+        self.event = array('B', [0]) * capacity
+        self.PID = array('q', [0]) * capacity
+        self.vruntime = array('d', [0.0]) * capacity
+        self.value = array('d', [0.0]) * capacity
+
+    def __len__(self):
+        return min(self.recorded, self.capacity)
+
+    def record(self, tick, event, PID, vruntime, value):
+        i = self.head
+        self.tick[i] = tick
+        self.event[i] = event
+        self.PID[i] = PID
+        self.vruntime[i] = vruntime
+        self.value[i] = value
+        i += 1
+        self.head = 0 if i == self.capacity else i
+        self.recorded += 1
+
+    def _ordered(self, column):
+        if self.recorded <= self.capacity:
+            return column[:self.recorded]
+        return column[self.head:] + column[:self.head]
+
+    def events(self):
+        """Yield (tick, event, PID, vruntime, value) tuples from oldest to newest."""
+        return zip(*(self._ordered(getattr(self, name)) for name, _ in TRACE_COLUMNS))
+
+    def dump(self, path):
+        """Write the buffered events, oldest first, as a header followed by one block per column.
+
+        Columns are little-endian and in TRACE_COLUMNS order, so the file can be
+        read back with load_trace() or memory-mapped column by column.
+        """
+        with open(path, 'wb') as f:
+            f.write(TRACE_HEADER.pack(TRACE_MAGIC, 1, len(self), self.recorded))
+            for name, _ in TRACE_COLUMNS:
+                column = self._ordered(getattr(self, name))
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                column.tofile(f)
+
+def load_trace(path):
+    """Read a file written by TraceBuffer.dump() into a dict of column arrays."""
+    with open(path, 'rb') as f:
+        magic, version, count, recorded = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+        if magic != TRACE_MAGIC or version != 1:
+            raise ValueError(f"{path} is not a CFS trace file")
+        columns = {'recorded': recorded}
+        for name, typecode in TRACE_COLUMNS:
+            column = array(typecode)
+            column.fromfile(f, count)
+            if sys.byteorder != 'little':
+                column.byteswap()
+            columns[name] = column
+    return columns
+
+def run_headless(tree, max_ticks=None, trace=None, rng=None):
+    """Run the CFS loop with no printing until the runqueue drains or max_ticks pass.
+
+    vruntime is charged with the runqueue's accounting, so a queue built with
+    KERNEL_ACCOUNTING runs entirely in integer nanoseconds. Picks, runs, requeues
+    and completions are recorded into `trace` (a TraceBuffer) when one is given.
+    Returns the number of ticks simulated.
+    """
+    uniform = (rng or random).uniform
+    to_time = tree.accounting.to_time
+    delta_fair = tree.accounting.delta_fair
+    pick_next = tree.pick_next
+    requeue = tree.requeue
+    delete_node = tree.delete_node
+    record = trace.record if trace is not None else None
+    tick = 0
+    while len(tree) and tick != max_ticks:
+        tick += 1
+        task = pick_next()
+        delta_exec = to_time(uniform(1, 5))
+        if delta_exec > task.timeToExec:
+            delta_exec = task.timeToExec
+        task.dealtExec += delta_exec
+        task.timeToExec -= delta_exec
+        vruntime = task.vruntime + delta_fair(delta_exec, task.weight)
+        if record:
+            record(tick, EVENT_PICK, task.PID, task.vruntime, 0.0)
+            record(tick, EVENT_RUN, task.PID, task.vruntime, delta_exec)
+        if task.timeToExec > 0:
+            requeue(task, vruntime)
+            if record:
+                record(tick, EVENT_REQUEUE, task.PID, vruntime, task.timeToExec)
+        else:
+            delete_node(task)
+            task.vruntime = vruntime
+            if record:
+                record(tick, EVENT_FINISH, task.PID, vruntime, task.dealtExec)
+    return tick
+
+class SchedTunables:
+    """CFS scheduling-period tunables and a per-switch overhead cost model.
+
+    All values are given in ms and converted with `accounting.to_time`. The
+    period is sched_latency, stretched to nr_running * min_granularity once more
+    than sched_latency / min_granularity tasks are runnable; each task's slice is
+    its weight's share of the period, never below min_granularity.
+    """
+    def __init__(self, sched_latency=6.0, min_granularity=0.75, wakeup_granularity=1.0,
+                 context_switch_cost=0.0, accounting=None):
+        self.accounting = accounting or LEGACY_ACCOUNTING
+        to_time = self.accounting.to_time
+        self.sched_latency = to_time(sched_latency)
+        self.min_granularity = to_time(min_granularity)
+        self.wakeup_granularity = to_time(wakeup_granularity)
+        self.context_switch_cost = to_time(context_switch_cost)
+        self.nr_latency = int(sched_latency // min_granularity)
+
+    def period(self, nr_running):
+        if nr_running > self.nr_latency:
+            return nr_running * self.min_granularity
+        return self.sched_latency
+
+    def time_slice(self, node, rq):
+        """Wall-clock slice for `node` on runqueue `rq` (which includes it)."""
+        slice_ = self.accounting.rescale(self.period(len(rq)), node.weight, rq.load)
+        return slice_ if slice_ > self.min_granularity else self.min_granularity
+
+    def wakeup_preempt(self, curr, woken):
+        """Whether a freshly woken task should preempt `curr`.
+
+        Like the kernel's wakeup_preempt_entity(), the woken task must be ahead
+        of curr by more than wakeup_granularity converted to its virtual time.
+        """
+        gran = self.accounting.delta_fair(self.wakeup_granularity, woken.weight)
+        return curr.vruntime - woken.vruntime > gran
+
+def run_sliced(tree, tunables, max_ticks=None, max_time=None, trace=None, stats=None):
+    """Run the CFS loop with slices derived from `tunables` instead of random run lengths.
+
+    Each pick of a different task than the one that ran last is a context switch
+    and costs tunables.context_switch_cost of wall-clock time in which no task
+    makes progress. Stops when the runqueue drains, after max_ticks slices or
+    once the clock passes max_time (in the accounting's time unit). Returns a
+    dict with ticks, clock, busy and overhead time, context_switches,
+    switch_rate (per time unit) and lost_fraction (overhead / clock). Events
+    are reported to `stats` (a SchedStats) when one is given.
+    """
+    time_slice = tunables.time_slice
+    switch_cost = tunables.context_switch_cost
+    delta_fair = tree.accounting.delta_fair
+    pick_next = tree.pick_next
+    requeue = tree.requeue
+    delete_node = tree.delete_node
+    record = trace.record if trace is not None else None
     tick = 0
-    while tree.root != tree.TNULL:
+    clock = busy = overhead = 0
+    switches = 0
+    prev = None
+    if stats is not None:
+        for task in tree.tasks.values():
+            stats.arrive(task.PID, task.weight, clock)
+    while len(tree) and tick != max_ticks and (max_time is None or clock < max_time):
         tick += 1
-        task = tree.delete_min()
-        delta_exec = random.uniform(1, 5)
+        task = pick_next()
+        if task is not prev:
+            switches += 1
+            overhead += switch_cost
+            clock += switch_cost
+            prev = task
+        delta_exec = time_slice(task, tree)
         if delta_exec > task.timeToExec:
             delta_exec = task.timeToExec
+        if stats is not None:
+            stats.run(task.PID, clock, delta_exec)
         task.dealtExec += delta_exec
-        task.vruntime += delta_exec * (1024 / task.weight)
         task.timeToExec -= delta_exec
-        print(f"T{tick} : Ran PID {task.PID} for {delta_exec:.2f} ms, Remaining: {task.timeToExec:.2f} ms, vruntime: {task.vruntime:.2f}")
+        busy += delta_exec
+        clock += delta_exec
+        vruntime = task.vruntime + delta_fair(delta_exec, task.weight)
+        if record:
+            record(tick, EVENT_PICK, task.PID, task.vruntime, 0.0)
+            record(tick, EVENT_RUN, task.PID, task.vruntime, delta_exec)
         if task.timeToExec > 0:
+            requeue(task, vruntime)
+            if record:
+                record(tick, EVENT_REQUEUE, task.PID, vruntime, task.timeToExec)
+        else:
+            delete_node(task)
+            task.vruntime = vruntime
+            prev = None
+            if stats is not None:
+                stats.finish(task.PID, clock)
+            if record:
+                record(tick, EVENT_FINISH, task.PID, vruntime, task.dealtExec)
+    return {
+        'ticks': tick,
+        'clock': clock,
+        'busy': busy,
+        'overhead': overhead,
+        'context_switches': switches,
+        'switch_rate': switches / clock if clock else 0.0,
+        'lost_fraction': overhead / clock if clock else 0.0,
+    }
+
+class EEVDFNode(Node):
+    """Node with the per-task state EEVDF needs: requested slice (None for the
+    tree's base_slice), virtual deadline, saved lag and the earliest deadline in
+    its subtree (the tree augmentation)."""
+    __slots__ = ('slice', 'deadline', 'min_deadline', 'lag')
+
+    def __init__(self, PID, niceValue=0, vruntime=0, dealtExec=0, timeToExec=10, weight=None, slice=None):
+        super().__init__(PID, niceValue, vruntime, dealtExec, timeToExec, weight)
+        self.slice = slice
+        self.deadline = None
+        self.min_deadline = float('inf')
+        self.lag = 0
+
+class EEVDFTree(RedBlackTree):
+    """RedBlackTree with EEVDF (earliest eligible virtual deadline first) selection.
+
+    Tasks stay keyed by vruntime, and every node also carries the minimum
+    virtual deadline of its subtree, maintained through rotations and along the
+    insert/delete path. A task is eligible when its vruntime does not exceed
+    the load-weighted average vruntime V, i.e. it has non-negative lag.
+    pick_next() finds the eligible task with the earliest deadline in O(log n),
+    following the kernel's pick_eevdf(). Each task requests a slice, its node's
+    `slice` or else `base_slice` (ms, default min_granularity): its deadline is
+    vruntime plus that slice in virtual time and is pushed out once the task
+    runs past it, so tasks asking for short slices get picked sooner.
+    Sleeping tasks keep their lag and are placed back at V - lag on wakeup.
+    Nodes must be EEVDFNodes.
+    """
+    def __init__(self, base_slice=0.75, accounting=None):
+        super().__init__(accounting)
+        self.TNULL = EEVDFNode(0)
+        self.TNULL.color = 0
+        self.root = self.TNULL
+        self.leftmost = self.TNULL
+        self.base_slice = self.accounting.to_time(base_slice)
+        self.weighted_vruntime = 0  # sum of weight * vruntime over queued tasks
+
+    def request(self, node):
+        """Wall-clock slice `node` asks for."""
+        return self.base_slice if node.slice is None else node.slice
+
+    def vslice(self, node):
+        return self.accounting.delta_fair(self.request(node), node.weight)
+
+    def avg_vruntime(self):
+        """The load-weighted average vruntime V (min_vruntime when empty)."""
+        if not self.load:
+            return self.min_vruntime
+        if isinstance(self.weighted_vruntime, int):
+            return self.weighted_vruntime // self.load
+        return self.weighted_vruntime / self.load
+
+    def update_min_vruntime(self):
+        if self.leftmost != self.TNULL and self.leftmost.vruntime > self.min_vruntime:
+            self.min_vruntime = self.leftmost.vruntime
+        return self.min_vruntime
+
+    def _update(self, node):
+        md = node.deadline
+        if node.left.min_deadline < md:
+            md = node.left.min_deadline
+        if node.right.min_deadline < md:
+            md = node.right.min_deadline
+        node.min_deadline = md
+
+    def _propagate(self, node):
+        while node is not None:
+            self._update(node)
+            node = node.parent
+
+    def left_rotate(self, x):
+        super().left_rotate(x)
+        self._update(x)
+        self._update(x.parent)
+
+    def right_rotate(self, x):
+        super().right_rotate(x)
+        self._update(x)
+        self._update(x.parent)
+
+    def insert(self, node):
+        if node.weight is None:
+            node.weight = self.accounting.weight(node.niceValue)
+        if node.deadline is None:
+            node.deadline = node.vruntime + self.vslice(node)
+        node.min_deadline = node.deadline
+        super().insert(node)
+        self.weighted_vruntime += node.weight * node.vruntime
+        self._propagate(node.parent)
+
+    def delete_node(self, node):
+        # Lowest node whose subtree loses `node`; rotations fix up the rest
+        if node.left == self.TNULL or node.right == self.TNULL:
+            start = node.parent
+        else:
+            y = self.minimum(node.right)
+            start = y if y.parent is node else y.parent
+        super().delete_node(node)
+        if self.root is self.TNULL:
+            self.weighted_vruntime = 0 # Drop float rounding left over from earlier tasks
+        else:
+            self.weighted_vruntime -= node.weight * node.vruntime
+        self._propagate(start)
+
+    def requeue(self, node, new_vruntime):
+        self.delete_node(node)
+        node.vruntime = new_vruntime
+        if new_vruntime >= node.deadline:
+            node.deadline = new_vruntime + self.vslice(node)
+        self.insert(node)
+
+    def pick_next(self):
+        TNULL = self.TNULL
+        if self.root is TNULL:
+            return None
+        load = self.load
+        weighted = self.weighted_vruntime
+        node = self.root
+        best = best_left = None
+        while node is not TNULL:
+            if node.vruntime * load > weighted:
+                # Not eligible; everything eligible is further left
+                node = node.left
+                continue
+            if best is None or node.deadline < best.deadline:
+                best = node
+            left = node.left
+            if left is not TNULL:
+                # Every task in an eligible node's left subtree is eligible too
+                if best_left is None or left.min_deadline < best_left.min_deadline:
+                    best_left = left
+                if left.min_deadline == node.min_deadline:
+                    break
+            if node.deadline == node.min_deadline:
+                break
+            node = node.right
+        if best is None:
+            # Rounding in the float average can leave nothing strictly eligible
+            return self.leftmost
+        if best_left is None or best_left.min_deadline >= best.deadline:
+            return best
+        node = best_left
+        while node is not TNULL:
+            if node.deadline == node.min_deadline:
+                return node
+            if node.left is not TNULL and node.left.min_deadline == node.min_deadline:
+                node = node.left
+            else:
+                node = node.right
+        return best
+
+    def time_slice(self, node, tunables):
+        return self.request(node)
+
+    def wakeup_preempt(self, curr, woken, tunables):
+        return self.pick_next() is not curr
+
+    def sleep(self, PID):
+        node = self.tasks[PID]
+        limit = 2 * self.vslice(node)
+        lag = self.avg_vruntime() - node.vruntime
+        node.lag = max(-limit, min(limit, lag))
+        return super().sleep(PID)
+
+    def wake(self, PID):
+        node = self.sleeping.pop(PID)
+        lag = node.lag
+        if self.load:
+            # Inserting the task shifts V towards it; inflate the lag to compensate
+            lag = self.accounting.rescale(lag, self.load + node.weight, self.load)
+        node.vruntime = self.avg_vruntime() - lag
+        node.deadline = node.vruntime + self.vslice(node)
+        self.insert(node)
+        return node
+
+    def renice(self, PID, niceValue):
+        node = self.tasks.get(PID)
+        if node is None:
+            return super().renice(PID, niceValue)
+        rescale = self.accounting.rescale
+        weight = self.accounting.weight(niceValue)
+        lag = self.avg_vruntime() - node.vruntime
+        self.delete_node(node)
+        request = node.deadline - node.vruntime
+        node.vruntime = self.avg_vruntime() - rescale(lag, node.weight, weight)
+        node.deadline = node.vruntime + rescale(request, node.weight, weight)
+        node.niceValue = niceValue
+        node.weight = weight
+        self.insert(node)
+        return node
+
+    def check_invariants(self):
+        black_height = super().check_invariants()
+        stack = [self.root]
+        weighted = magnitude = 0
+        while stack:
+            node = stack.pop()
+            if node == self.TNULL:
+                continue
+            expected = min(node.deadline, node.left.min_deadline, node.right.min_deadline)
+            if node.min_deadline != expected:
+                raise ValueError(f"P{node.PID} has a stale min_deadline")
+            weighted += node.weight * node.vruntime
+            magnitude += abs(node.weight * node.vruntime)
+            stack.append(node.left)
+            stack.append(node.right)
+        if isinstance(self.weighted_vruntime, int):
+            stale = weighted != self.weighted_vruntime
+        else:
+            # The float sum is kept incrementally, so allow for accumulated rounding
+            stale = not math.isclose(weighted, self.weighted_vruntime, rel_tol=1e-9, abs_tol=1e-9 * (magnitude + 1))
+        if stale:
+            raise ValueError("weighted vruntime sum is out of date")
+        return black_height
+
+def run_wakeup_workload(tree, tunables, workload, duration, seed=0):
+    """Simulate sleeping and CPU-bound tasks and measure wakeup latency.
+
+    `workload` is a list of (PID, niceValue, burst, sleep, slice) tuples in ms:
+    a task runs for a random burst in [burst / 2, burst * 3 / 2], then sleeps for
+    a random time in [sleep / 2, sleep * 3 / 2]; sleep=None makes it CPU-bound.
+    `slice` is the slice the task requests from an EEVDFTree (None for its
+    base_slice) and is ignored by plain CFS.
+    Every task draws from its own seeded generator, so two runs with different
+    runqueues see the same bursts and sleeps. The running task keeps its slice
+    (tree.time_slice) unless a wakeup preempts it (tree.wakeup_preempt).
+    Returns {PID: [wakeup latencies]} and {PID: CPU time received}, in the
+    accounting's time unit.
+    """
+    to_time = tree.accounting.to_time
+    delta_fair = tree.accounting.delta_fair
+    duration = to_time(duration)
+    node_type = EEVDFNode if isinstance(tree, EEVDFTree) else Node
+    rngs = {}
+    specs = {}
+    burst_left = {}
+    for PID, niceValue, burst, sleep, slice_ in workload:
+        rngs[PID] = random.Random(seed * 1000003 + PID)
+        specs[PID] = (burst, sleep)
+        node = node_type(PID, niceValue, weight=tree.accounting.weight(niceValue))
+        if slice_ is not None and node_type is EEVDFNode:
+            node.slice = to_time(slice_)
+        node.vruntime = tree.update_min_vruntime()
+        tree.insert(node)
+        burst_left[PID] = to_time(rngs[PID].uniform(burst / 2, burst * 3 / 2)) if sleep is not None else None
+    latencies = {PID: [] for PID in specs}
+    cpu_time = {PID: 0 for PID in specs}
+    sleepers = []
+    woke_at = {}
+    clock = 0
+    curr = None
+    slice_left = 0
+    while clock < duration:
+        while sleepers and sleepers[0][0] <= clock:
+            wake_time, PID = heapq.heappop(sleepers)
+            woken = tree.wake(PID)
+            woke_at[PID] = wake_time
+            if curr is not None and tree.wakeup_preempt(curr, woken, tunables):
+                curr = None
+        if not len(tree):
+            clock = sleepers[0][0]
+            continue
+        if curr is None:
+            curr = tree.pick_next()
+            slice_left = tree.time_slice(curr, tunables)
+            if curr.PID in woke_at:
+                latencies[curr.PID].append(clock - woke_at.pop(curr.PID))
+        PID = curr.PID
+        run = slice_left
+        if burst_left[PID] is not None and burst_left[PID] < run:
+            run = burst_left[PID]
+        if sleepers and sleepers[0][0] - clock < run:
+            run = sleepers[0][0] - clock
+        if duration - clock < run:
+            run = duration - clock
+        clock += run
+        slice_left -= run
+        cpu_time[PID] += run
+        tree.requeue(curr, curr.vruntime + delta_fair(run, curr.weight))
+        if burst_left[PID] is not None:
+            burst_left[PID] -= run
+            if burst_left[PID] <= 0:
+                burst, sleep = specs[PID]
+                rng = rngs[PID]
+                tree.sleep(PID)
+                heapq.heappush(sleepers, (clock + to_time(rng.uniform(sleep / 2, sleep * 3 / 2)), PID))
+                burst_left[PID] = to_time(rng.uniform(burst / 2, burst * 3 / 2))
+                curr = None
+                continue
+        if slice_left <= 0:
+            curr = None
+    return latencies, cpu_time
+
+class TaskGroup(Node):
+    """A cgroup-style task group: an entity with `shares` as its weight in the
+    parent group's runqueue, owning a runqueue of its own tasks and subgroups.
+    Its PID is ('group', name), so group names never collide with task PIDs."""
+    __slots__ = ('name', 'runqueue', 'parentGroup', 'cpuTime')
+
+    def __init__(self, name, shares=NICE_0_LOAD, parentGroup=None, runqueue=RedBlackTree, accounting=None):
+        super().__init__(('group', name), weight=shares)
+        self.name = name
+        self.runqueue = runqueue(accounting=accounting)
+        self.parentGroup = parentGroup
+        self.cpuTime = 0
+
+class GroupScheduler:
+    """Hierarchical CFS: CPU time is split between groups by shares first and
+    between the tasks of a group by weight second.
+
+    Every group keeps its own vruntime clock. pick_next() walks down from the
+    root group taking the leftmost entity at each level until it reaches a task,
+    and charge() advances the task's vruntime in its group and each group's
+    vruntime in its parent, each scaled by that entity's own weight. A group is
+    only queued in its parent while it has runnable tasks, and is placed at the
+    parent's min_vruntime when it becomes runnable again.
+    """
+    def __init__(self, runqueue=RedBlackTree, accounting=None):
+        self.accounting = accounting or LEGACY_ACCOUNTING
+        self.runqueue = runqueue
+        self.root = TaskGroup('/', runqueue=runqueue, accounting=self.accounting)
+        self.groups = {'/': self.root}
+        self.task_group = {}
+
+    def __len__(self):
+        return len(self.task_group)
+
+    def create_group(self, name, shares=NICE_0_LOAD, parent='/'):
+        if name in self.groups:
+            raise ValueError(f"group {name!r} already exists")
+        group = TaskGroup(name, shares, self.groups[parent], self.runqueue, self.accounting)
+        self.groups[name] = group
+        return group
+
+    def set_shares(self, name, shares):
+        """Change a group's weight in its parent; like RunQueue.renice, a queued group
+        keeps its weighted distance from the parent's min_vruntime."""
+        group = self.groups[name]
+        if group.parentGroup is None:
+            raise ValueError("root group has no shares")
+        rq = group.parentGroup.runqueue
+        if group.PID in rq.tasks:
+            base = rq.update_min_vruntime()
+            rq.requeue(group, base + self.accounting.rescale(group.vruntime - base, group.weight, shares))
+            rq.load += shares - group.weight
+        group.weight = shares
+
+    def _enqueue(self, entity, group):
+        rq = group.runqueue
+        base = rq.update_min_vruntime()
+        if entity.vruntime < base:
+            entity.vruntime = base
+        rq.insert(entity)
+        if len(rq) == 1 and group.parentGroup is not None:
+            self._enqueue(group, group.parentGroup)
+
+    def _dequeue(self, entity, group):
+        rq = group.runqueue
+        rq.update_min_vruntime()
+        rq.delete_node(entity)
+        if not len(rq) and group.parentGroup is not None:
+            self._dequeue(group, group.parentGroup)
+
+    def add_task(self, node, group='/'):
+        if node.PID in self.task_group:
+            raise ValueError(f"PID {node.PID} is already queued")
+        group = self.groups[group]
+        self.task_group[node.PID] = group
+        self._enqueue(node, group)
+        return group
+
+    def remove_task(self, PID):
+        node = self.task_group[PID].runqueue.tasks[PID]
+        self._dequeue(node, self.task_group.pop(PID))
+        return node
+
+    def pick_next(self):
+        entity = self.root.runqueue.pick_next()
+        while isinstance(entity, TaskGroup):
+            entity = entity.runqueue.pick_next()
+        return entity
+
+    def charge(self, node, delta_exec):
+        """Charge `delta_exec` of CPU time to `node` and every group above it."""
+        delta_fair = self.accounting.delta_fair
+        entity = node
+        group = self.task_group[node.PID]
+        while group is not None:
+            group.runqueue.requeue(entity, entity.vruntime + delta_fair(delta_exec, entity.weight))
+            group.cpuTime += delta_exec
+            entity = group
+            group = group.parentGroup
+
+    def run(self, max_time=None, slice_=3.0):
+        """Run fixed `slice_` ms slices until all tasks finish or `max_time` ms pass.
+
+        Returns the simulated clock.
+        """
+        to_time = self.accounting.to_time
+        slice_ = to_time(slice_)
+        max_time = None if max_time is None else to_time(max_time)
+        clock = 0
+        while self.task_group and (max_time is None or clock < max_time):
+            task = self.pick_next()
+            delta_exec = slice_ if slice_ < task.timeToExec else task.timeToExec
+            task.dealtExec += delta_exec
+            task.timeToExec -= delta_exec
+            clock += delta_exec
+            self.charge(task, delta_exec)
+            if task.timeToExec <= 0:
+                self.remove_task(task.PID)
+        return clock
+
+    def shares(self):
+        """Fraction of all CPU time each group has received so far."""
+        total = self.root.cpuTime or 1
+        return {name: group.cpuTime / total for name, group in self.groups.items()}
+
+def _split_lengths(field):
+    return [float(x) for x in field.split(';')] if field else []
+
+def read_workload(path):
+    """Stream (arrival, PID, niceValue, bursts, sleeps) records from a workload trace.
+
+    `.jsonl` files hold one object per line with keys arrival, pid, nice, bursts
+    and sleeps (lists); anything else is read as CSV with those columns, the
+    lists written as ';'-separated numbers. Times are in ms. A task alternates
+    bursts[0], sleeps[0], bursts[1], ... so sleeps has one entry fewer than
+    bursts. Records are read one line at a time and must be sorted by arrival.
+    """
+    last = float('-inf')
+    with open(path, newline='') as f:
+        if path.endswith('.jsonl'):
+            rows = (json.loads(line) for line in f if line.strip())
+            records = ((float(r['arrival']), int(r['pid']), int(r.get('nice', 0)),
+                        [float(x) for x in r['bursts']], [float(x) for x in r.get('sleeps', ())])
+                       for r in rows)
+        else:
+            records = ((float(r['arrival']), int(r['pid']), int(r.get('nice') or 0),
+                        _split_lengths(r['bursts']), _split_lengths(r.get('sleeps')))
+                       for r in csv.DictReader(f))
+        for record in records:
+            arrival, PID, _, bursts, sleeps = record
+            if arrival < last:
+                raise ValueError(f"{path}: PID {PID} arrives at {arrival} ms, before the previous record")
+            if not bursts or len(sleeps) != len(bursts) - 1:
+                raise ValueError(f"{path}: PID {PID} needs one sleep between each pair of bursts")
+            last = arrival
+            yield record
+
+def replay_workload(records, tree, tunables=None, stats=None):
+    """Replay workload records through `tree`, yielding per-task statistics.
+
+    `records` is any iterable in read_workload()'s format; it is consumed lazily,
+    one record ahead of the simulated clock, so memory grows with the number of
+    live tasks rather than the length of the trace. Tasks run for
+    tree.time_slice() at a time. As each task finishes this yields
+    (PID, arrival, finish, cpu, wait) with times in the accounting's unit,
+    where wait is the time spent runnable but not running. Arrivals, slices,
+    sleeps, wakeups and completions are also reported to `stats` (a SchedStats)
+    when one is given. A PID may be reused once its earlier task has finished;
+    reusing it sooner raises ValueError.
+    """
+    tunables = tunables or SchedTunables(accounting=tree.accounting)
+    to_time = tree.accounting.to_time
+    delta_fair = tree.accounting.delta_fair
+    records = iter(records)
+    pending = next(records, None)
+    live = {}  # PID -> [arrival, remaining bursts, remaining sleeps, cpu, slept]
+    sleepers = []
+    clock = 0
+    while True:
+        while pending is not None and to_time(pending[0]) <= clock:
+            arrival, PID, niceValue, bursts, sleeps = pending
+            if PID in live:
+                # Runnable or asleep: tree.insert() alone would miss a sleeping task
+                raise ValueError(f"PID {PID} arrives at {arrival} ms while an earlier task with that PID is live")
+            weight = tree.accounting.weight(niceValue)
+            bursts = [to_time(b) for b in reversed(bursts)]
+            node = Node(PID, niceValue, timeToExec=bursts.pop(), weight=weight)
+            node.vruntime = tree.update_min_vruntime()
+            tree.insert(node)
+            if stats is not None:
+                stats.arrive(PID, weight, clock, to_time(arrival))
+            live[PID] = [to_time(arrival), bursts, [to_time(s) for s in reversed(sleeps)], 0, 0]
+            pending = next(records, None)
+        while sleepers and sleepers[0][0] <= clock:
+            wake_time, PID = heapq.heappop(sleepers)
+            tree.wake(PID)
+            if stats is not None:
+                stats.wake(PID, clock, wake_time)
+        if not len(tree):
+            if pending is not None and (not sleepers or to_time(pending[0]) < sleepers[0][0]):
+                clock = to_time(pending[0])
+            elif sleepers:
+                clock = sleepers[0][0]
+            else:
+                return
+            continue
+        task = tree.pick_next()
+        delta_exec = tree.time_slice(task, tunables)
+        if delta_exec > task.timeToExec:
+            delta_exec = task.timeToExec
+        if stats is not None:
+            stats.run(task.PID, clock, delta_exec)
+        clock += delta_exec
+        task.dealtExec += delta_exec
+        task.timeToExec -= delta_exec
+        state = live[task.PID]
+        state[3] += delta_exec
+        tree.requeue(task, task.vruntime + delta_fair(delta_exec, task.weight))
+        if task.timeToExec > 0:
+            continue
+        if state[1]:
+            task.timeToExec = state[1].pop()
+            sleep = state[2].pop()
+            state[4] += sleep
+            tree.sleep(task.PID)
+            if stats is not None:
+                stats.block(task.PID, clock)
+            heapq.heappush(sleepers, (clock + sleep, task.PID))
+        else:
+            tree.delete_node(task)
+            del live[task.PID]
+            if stats is not None:
+                stats.finish(task.PID, clock)
+            arrival, _, _, cpu, slept = state
+            yield task.PID, arrival, clock, cpu, clock - arrival - cpu - slept
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CFS scheduling simulation")
+    parser.add_argument("--tasks", type=int, default=6)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="rbtree",
+                        help="runqueue implementation for --cpus and --headless runs")
+    parser.add_argument("--cpus", type=int, default=1,
+                        help="simulate N cores with per-CPU runqueues and load balancing")
+    parser.add_argument("--balance-interval", type=float, default=4.0, help="ms between periodic balancing")
+    parser.add_argument("--migration-cost", type=float, default=0.5, help="ms lost per migrated task")
+    parser.add_argument("--headless", action="store_true", help="run without per-tick output")
+    parser.add_argument("--ticks", type=int, default=None, help="stop a headless run after this many ticks")
+    parser.add_argument("--trace", help="record a headless run's events and dump them to this file")
+    parser.add_argument("--trace-capacity", type=int, default=1 << 20)
+    parser.add_argument("--accounting", choices=sorted(ACCOUNTING), default="legacy",
+                        help="kernel: sched_prio_to_weight, nice -20..19 and integer ns vruntime")
+    parser.add_argument("--slices", action="store_true",
+                        help="headless runs derive slices from the tunables below instead of random lengths")
+    parser.add_argument("--sched-latency", type=float, default=6.0, help="ms")
+    parser.add_argument("--min-granularity", type=float, default=0.75, help="ms")
+    parser.add_argument("--switch-cost", type=float, default=0.0, help="ms lost per context switch")
+    parser.add_argument("--workload", help="replay a CSV/JSONL workload trace instead of random tasks")
+    parser.add_argument("--stats", action="store_true",
+                        help="report wait, turnaround and fairness statistics for --workload and --slices runs")
+    parser.add_argument("--stats-interval", type=float, default=None,
+                        help="also print the statistics every this many simulated ms")
+    args = parser.parse_args()
+    accounting = ACCOUNTING[args.accounting]
+    ms = accounting.to_time(1)
+    stats = None
+    if args.stats or args.stats_interval:
+        stats = SchedStats(sample_interval=args.stats_interval and accounting.to_time(args.stats_interval))
+
+    def print_stats(summary):
+        wait, turnaround = summary['wait'], summary['turnaround']
+        print(f"[{summary['clock'] / ms:.1f} ms] {summary['finished']} finished, {summary['live']} live, "
+              f"{summary['slices']} slices, fairness {summary['fairness']:.3f}")
+        print(f"  wait ms: mean {wait['mean'] / ms:.2f} p50 {wait['p50'] / ms:.2f} p90 {wait['p90'] / ms:.2f} "
+              f"p99 {wait['p99'] / ms:.2f} max {wait['max'] / ms:.2f}")
+        if turnaround['count']:
+            print(f"  turnaround ms: mean {turnaround['mean'] / ms:.2f} p50 {turnaround['p50'] / ms:.2f} "
+                  f"p99 {turnaround['p99'] / ms:.2f} max {turnaround['max'] / ms:.2f}")
+
+    def random_task(pid):
+        nice = random.randint(-20, 19) if accounting is KERNEL_ACCOUNTING else random.randint(0, 10)
+        return Node(PID=pid, niceValue=nice, timeToExec=accounting.to_time(random.uniform(10, 20)),
+                    weight=accounting.weight(nice))
+
+    if args.workload:
+        tree = BACKENDS[args.backend](accounting=accounting)
+        tunables = SchedTunables(args.sched_latency, args.min_granularity, accounting=accounting)
+        finished = total_wait = total_turnaround = max_wait = max_turnaround = 0
+        start = time.perf_counter()
+        for PID, arrival, finish, cpu, wait in replay_workload(read_workload(args.workload), tree, tunables, stats):
+            finished += 1
+            total_wait += wait
+            total_turnaround += finish - arrival
+            max_wait = max(max_wait, wait)
+            max_turnaround = max(max_turnaround, finish - arrival)
+        elapsed = time.perf_counter() - start
+        if finished:
+            print(f"Replayed {finished} tasks in {elapsed:.2f} s")
+            print(f"wait: mean {total_wait / finished / ms:.2f} ms, max {max_wait / ms:.2f} ms")
+            print(f"turnaround: mean {total_turnaround / finished / ms:.2f} ms, max {max_turnaround / ms:.2f} ms")
+        if stats is not None:
+            for summary in stats.samples:
+                print_stats(summary)
+            print_stats(stats.summary())
+    elif args.cpus > 1:
+        sim = MultiCoreSimulator(args.cpus, args.balance_interval, args.migration_cost,
+                                 runqueue=BACKENDS[args.backend], accounting=accounting)
+        for pid in range(1, args.tasks + 1):
+            sim.add_task(random_task(pid))
+        result = sim.run()
+        print(f"{result['completed']} tasks on {result['cpus']} cores in {result['makespan'] / ms:.2f} ms "
+              f"({result['throughput'] * ms:.3f} tasks/ms, fairness {result['fairness']:.3f})")
+        print(f"{result['migrations']} migrations costing {result['migration_overhead'] / ms:.2f} ms")
+        for cpu, utilization in zip(sim.cpus, result['utilization']):
+            print(f"CPU{cpu.cpu_id}: {utilization:6.1%} busy, {cpu.completed} completed, {cpu.migrations_in} pulled")
+    elif args.headless:
+        tree = BACKENDS[args.backend](accounting=accounting)
+        for pid in range(1, args.tasks + 1):
+            tree.insert(random_task(pid))
+        trace = TraceBuffer(args.trace_capacity) if args.trace else None
+        start = time.perf_counter()
+        if args.slices:
+            tunables = SchedTunables(args.sched_latency, args.min_granularity,
+                                     context_switch_cost=args.switch_cost, accounting=accounting)
+            result = run_sliced(tree, tunables, args.ticks, trace=trace, stats=stats)
+            ticks = result['ticks']
+            print(f"{result['context_switches']} context switches in {result['clock'] / ms:.2f} ms "
+                  f"({result['switch_rate'] * ms * 1000:.0f}/s), {result['lost_fraction']:.2%} lost to switching")
+        else:
+            ticks = run_headless(tree, args.ticks, trace)
+        elapsed = time.perf_counter() - start
+        print(f"{ticks} ticks in {elapsed:.2f} s ({ticks / elapsed:.0f} ticks/s), {len(tree)} tasks still queued")
+        if trace is not None:
+            trace.dump(args.trace)
+            print(f"Wrote {len(trace)} of {trace.recorded} events to {args.trace}")
+        if stats is not None:
+            for summary in stats.samples:
+                print_stats(summary)
+            print_stats(stats.summary())
+    else:
+        tree = RedBlackTree()
+        for pid in range(1, args.tasks + 1):
+            nice = random.randint(0, 10)
+            exec_time = random.uniform(10, 20)
+            task = Node(PID=pid, niceValue=nice, vruntime=0, timeToExec=exec_time)
             tree.insert(task)
-        print("\nCurrent Task Tree:")
+        print("\nInitial Task Tree:")
         tree.print_tree()
-        print("\n")
-    print("--- All Tasks Completed ---")
+        print("\n--- Starting Scheduling Simulation ---\n")
+        tick = 0
+        while tree.root != tree.TNULL:
+            tick += 1
+            task = tree.pick_next()
+            delta_exec = random.uniform(1, 5)
+            if delta_exec > task.timeToExec:
+                delta_exec = task.timeToExec
+            task.dealtExec += delta_exec
+            task.timeToExec -= delta_exec
+            vruntime = task.vruntime + delta_exec * (1024 / task.weight)
+            if task.timeToExec > 0:
+                tree.requeue(task, vruntime)
+            else:
+                tree.delete_node(task)
+                task.vruntime = vruntime
+            print(f"T{tick} : Ran PID {task.PID} for {delta_exec:.2f} ms, Remaining: {task.timeToExec:.2f} ms, vruntime: {task.vruntime:.2f}")
+            print("\nCurrent Task Tree:")
+            tree.print_tree()
+            print("\n")
+        print("--- All Tasks Completed ---")
 
 
 
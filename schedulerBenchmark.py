@@ -0,0 +1,406 @@
+import time
+import random
+import argparse
+import threading
+from collections import deque
+
+import numpy as np
+import torch
+
+from aitaskscheduler import (TaskQueue, AITaskScheduler, SchedulingEngine, ReinforcementLearner, TimePredictor,
+                             MLPSnapshot, SystemMonitor, MetricsRing, TaskHistoryStore)
+
+
+class SortedListQueue:
+    """The original TaskQueue: append and re-sort under the lock, pop(0) to dispatch."""
+    def __init__(self):
+        self.queue = []
+        self.lock = threading.Lock()
+
+    def add_task(self, task):
+        with self.lock:
+            self.queue.append(task)
+            self.queue.sort(key=lambda x: x['priority'], reverse=True)
+
+    def get_next_task(self):
+        with self.lock:
+            if not self.queue:
+                return None
+            return self.queue.pop(0)
+
+    def reschedule_task(self, task):
+        with self.lock:
+            self.queue.append(task)
+            self.queue.sort(key=lambda x: x['priority'], reverse=True)
+
+
+def _task(i, rng):
+    return {'name': f'task-{i}', 'priority': rng.randint(1, 100), 'requirements': {}}
+
+
+def _cycle(queue, ops, rng, first_id):
+    """`ops` rounds of add, dispatch and delay (priority - 10, reschedule)."""
+    start = time.perf_counter()
+    for i in range(first_id, first_id + ops):
+        queue.add_task(_task(i, rng))
+        task = queue.get_next_task()
+        task['priority'] = max(1, task['priority'] - 10)
+        queue.reschedule_task(task)
+        queue.get_next_task()
+    return (time.perf_counter() - start) / ops
+
+
+def bench_task_queue(sizes, cycles=2000, seed=0):
+    """Per-round cost of add + dispatch + delay + dispatch with N tasks queued.
+
+    The sorted-list baseline runs fewer rounds at large N so it finishes in
+    reasonable time.
+    """
+    print(f"{'queued':>9} {'list us':>10} {'heap us':>9} {'update us':>10} {'remove us':>10} {'speedup':>8}")
+    for n in sizes:
+        rng = random.Random(seed)
+        tasks = [_task(i, rng) for i in range(n)]
+
+        baseline = SortedListQueue()
+        baseline.queue = sorted(tasks, key=lambda x: x['priority'], reverse=True)
+        list_time = _cycle(baseline, max(20, min(cycles, 10**7 // n)), random.Random(seed + 1), n)
+
+        heap = TaskQueue()
+        for task in tasks:
+            heap.add_task(dict(task))
+        heap_time = _cycle(heap, cycles, random.Random(seed + 1), n)
+
+        ids = list(heap.entries)
+        picks = [rng.choice(ids) for _ in range(cycles)]
+        start = time.perf_counter()
+        for task_id in picks:
+            heap.update_priority(task_id, rng.randint(1, 100))
+        update_time = (time.perf_counter() - start) / cycles
+
+        picks = rng.sample(ids, min(cycles, n // 2))
+        start = time.perf_counter()
+        for task_id in picks:
+            heap.remove(task_id)
+        remove_time = (time.perf_counter() - start) / len(picks)
+
+        print(f"{n:>9} {list_time * 1e6:>10.1f} {heap_time * 1e6:>9.1f} {update_time * 1e6:>10.2f} "
+              f"{remove_time * 1e6:>10.2f} {list_time / heap_time:>7.0f}x")
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def bench_dispatch_latency(count=200, gap=0.005, poll_interval=0.1):
+    """Time from add_task to a waiting consumer receiving the task.
+
+    A producer queues `count` tasks `gap` seconds apart. The consumer either
+    blocks in get_next_task(timeout=None) or polls with the engine's old
+    sleep(poll_interval) loop.
+    """
+    print(f"{'consumer':>9} {'p50 us':>10} {'p99 us':>10} {'max us':>10}")
+    for mode in ("blocking", "polling"):
+        queue = TaskQueue()
+        latencies = []
+
+        def consume():
+            while len(latencies) < count:
+                task = queue.get_next_task(timeout=None if mode == "blocking" else 0)
+                if task is None:
+                    time.sleep(poll_interval)
+                    continue
+                latencies.append(time.perf_counter() - task['queued_at'])
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for i in range(count):
+            time.sleep(gap)
+            queue.add_task({'name': f'task-{i}', 'priority': 50, 'requirements': {}, 'queued_at': time.perf_counter()})
+        consumer.join()
+        latencies.sort()
+        print(f"{mode:>9} {_percentile(latencies, 0.5) * 1e6:>10.0f} {_percentile(latencies, 0.99) * 1e6:>10.0f} "
+              f"{latencies[-1] * 1e6:>10.0f}")
+
+
+def bench_decisions(batch_sizes, tasks=4096, seed=0):
+    """Scheduling decisions per second when deciding K queued tasks at a time.
+
+    K=1 uses the per-task _make_scheduling_decision path; larger K dequeue a
+    batch and run each model once on the whole feature matrix. Metrics are read
+    from the monitor's snapshot once per batch, as the engine does.
+    """
+    scheduler = AITaskScheduler()
+    print(f"{'batch':>6} {'decisions/s':>12} {'us/decision':>12}")
+    for k in batch_sizes:
+        rng = random.Random(seed)
+        engine = SchedulingEngine(scheduler, batch_size=k)
+        queue = scheduler.task_queue
+        for i in range(tasks):
+            queue.add_task({'name': f'task-{i}', 'priority': rng.randint(1, 100),
+                            'requirements': {'cpu': rng.randint(1, 100), 'memory': rng.randint(1, 1000)},
+                            'created_time': time.time()})
+        decided = 0
+        start = time.perf_counter()
+        while decided < tasks:
+            metrics = scheduler.monitor.get_metrics()
+            if k == 1:
+                engine._make_scheduling_decision(queue.get_next_task(), metrics)
+                decided += 1
+            else:
+                decided += len(engine._make_scheduling_decisions(queue.get_next_tasks(k), metrics))
+        elapsed = time.perf_counter() - start
+        engine.task_executor.thread_pool.shutdown()
+        print(f"{k:>6} {decided / elapsed:>12.0f} {elapsed / decided * 1e6:>12.1f}")
+
+
+def _timed(fn, states, repeat=3):
+    """Best per-call time of fn over `states`."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for state in states:
+            fn(state)
+        best = min(best, (time.perf_counter() - start) / len(states))
+    return best
+
+
+def bench_inference(calls=20000, seed=0):
+    """Per-decision latency of the learner and time predictor, one state at a time.
+
+    Compares the old torch path (fresh FloatTensor, eval()/train() toggle or
+    autograd on), torch.inference_mode() and the NumPy snapshots.
+    """
+    rng = np.random.default_rng(seed)
+    states = [list(row) for row in rng.random((calls, 8), dtype=np.float32) * 100]
+    learner = ReinforcementLearner()
+    predictor = TimePredictor()
+    snapshot = learner.policy
+    predictor_snapshot = MLPSnapshot(predictor.net)
+
+    def torch_action(state):
+        learner.model.eval()
+        with torch.no_grad():
+            act_values = learner.model(torch.FloatTensor(state))
+        learner.model.train()
+        return torch.argmax(act_values).item()
+
+    def inference_mode_action(state):
+        with torch.inference_mode():
+            return learner.model(torch.tensor(state)).argmax().item()
+
+    rows = [
+        ("learner: torch eval/train", _timed(torch_action, states)),
+        ("learner: inference_mode", _timed(inference_mode_action, states)),
+        ("learner: numpy snapshot", _timed(lambda state: int(snapshot(state).argmax()), states)),
+        ("predictor: torch autograd", _timed(lambda state: predictor(torch.FloatTensor(state[:6])).item(), states)),
+        ("predictor: numpy snapshot", _timed(lambda state: float(predictor_snapshot(state[:6])[0]), states)),
+    ]
+    print(f"{'path':<28} {'us/call':>8}")
+    for name, seconds in rows:
+        print(f"{name:<28} {seconds * 1e6:>8.2f}")
+
+
+def bench_metrics(calls=2000):
+    """Cost of sampling metrics synchronously vs reading the published snapshot."""
+    monitor = SystemMonitor()
+    monitor.collect_metrics()
+    start = time.perf_counter()
+    for _ in range(calls):
+        monitor.collect_metrics()
+    sample_time = (time.perf_counter() - start) / calls
+    start = time.perf_counter()
+    for _ in range(calls):
+        monitor.get_metrics()
+    read_time = (time.perf_counter() - start) / calls
+    print(f"collect_metrics: {sample_time * 1e6:8.2f} us/call")
+    print(f"get_metrics:     {read_time * 1e6:8.2f} us/call")
+
+
+def bench_history(sizes, calls=2000, interval=0.1):
+    """Cost of a 'CPU over the last 30 s' query: deque copy vs MetricsRing views.
+
+    The deque baseline has to copy its samples into an array before it can
+    compute anything; the ring answers from a view of its buffer.
+    """
+    print(f"{'history':>8} {'deque mean us':>14} {'ring mean us':>13} {'ring trend us':>14} {'ring p90 us':>12}")
+    for n in sizes:
+        rng = np.random.default_rng(0)
+        samples = rng.random(n) * 100
+        cpu = deque(samples, maxlen=n)
+        times = deque(np.arange(n) * interval, maxlen=n)
+        ring = MetricsRing(capacity=n)
+        for i, value in enumerate(samples):
+            ring.append(i * interval, value, 0.0, 0.0, 0.0)
+
+        def deque_mean():
+            t = np.array(times)
+            values = np.array(cpu)
+            return values[t >= t[-1] - 30].mean()
+
+        rows = [deque_mean, lambda: ring.mean('cpu', 30), lambda: ring.trend('cpu', 30),
+                lambda: ring.percentile('cpu', 90, 30)]
+        results = []
+        for fn in rows:
+            start = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            results.append((time.perf_counter() - start) / calls * 1e6)
+        print(f"{n:>8} {results[0]:>14.1f} {results[1]:>13.1f} {results[2]:>14.1f} {results[3]:>12.1f}")
+
+
+def bench_task_history(sizes, appends=5000, seed=0):
+    """Logging results and scoring the last 100: list with pop(0) vs TaskHistoryStore.
+
+    Each round appends one result and evaluates success rate and mean
+    successful duration over the last 100, as MetaLearner does.
+    """
+    print(f"{'capacity':>9} {'list us':>9} {'store us':>9}")
+    for capacity in sizes:
+        rng = random.Random(seed)
+        results = [{'task': {'name': f'type-{rng.randint(0, 9)}'}, 'success': rng.random() < 0.9,
+                    'actual_duration': rng.uniform(0.1, 5), 'predicted_duration': 1.0,
+                    'metrics_at_completion': {'cpu': 50.0, 'memory': 40.0}} for _ in range(appends)]
+        history = [dict(results[i % appends]) for i in range(capacity)]
+        start = time.perf_counter()
+        for result in results:
+            history.append(result)
+            if len(history) > capacity:
+                history.pop(0)
+            recent = history[-100:]
+            successful = [t for t in recent if t.get('success', False)]
+            sum(t['actual_duration'] for t in successful) / len(successful)
+            len(successful) / len(recent)
+        list_time = (time.perf_counter() - start) / appends
+
+        store = TaskHistoryStore(capacity)
+        for i in range(capacity):
+            store.append(results[i % appends])
+        start = time.perf_counter()
+        for result in results:
+            store.append(result)
+            store.success_rate(last=100)
+            store.mean_duration(last=100)
+        store_time = (time.perf_counter() - start) / appends
+        print(f"{capacity:>9} {list_time * 1e6:>9.1f} {store_time * 1e6:>9.1f}")
+
+
+def _deque_replay(learner, memory, batch_size):
+    """The original ReinforcementLearner.replay over a deque of tuples."""
+    minibatch = random.sample(memory, batch_size)
+    states, actions, rewards, next_states = zip(*minibatch)
+    states_tensor = torch.FloatTensor(np.array(states))
+    actions_tensor = torch.LongTensor(actions)
+    rewards_tensor = torch.FloatTensor(rewards)
+    non_final_mask = torch.tensor([s is not None for s in next_states], dtype=torch.bool)
+    non_final_next_states = torch.FloatTensor(np.array([s for s in next_states if s is not None]))
+    current_q_values = learner.model(states_tensor).gather(1, actions_tensor.unsqueeze(1)).squeeze(1)
+    next_q_values = torch.zeros(batch_size)
+    if non_final_next_states.shape[0] > 0:
+        next_q_values[non_final_mask] = learner.model(non_final_next_states).max(1)[0].detach()
+    loss = torch.nn.MSELoss()(current_q_values, rewards_tensor + learner.gamma * next_q_values)
+    learner.optimizer.zero_grad()
+    loss.backward()
+    learner.optimizer.step()
+
+
+def bench_replay(sizes, steps=1000, batch_size=32, seed=0):
+    """Replay steps per second: deque of tuples vs preallocated ReplayBuffer.
+
+    Both memories hold the same `capacity` transitions (one in ten terminal)
+    and each step is a full sample + forward + backward + optimizer step, so
+    the difference is sampling and tensor construction. random.sample on a
+    deque indexes from the nearer end, so the baseline slows as it grows.
+    """
+    print(f"{'capacity':>9} {'deque steps/s':>14} {'buffer steps/s':>15} {'speedup':>8}")
+    for capacity in sizes:
+        rng = np.random.default_rng(seed)
+        states = rng.random((capacity, 8), dtype=np.float32)
+        next_states = rng.random((capacity, 8), dtype=np.float32)
+        actions = rng.integers(0, 3, capacity)
+        rewards = rng.normal(size=capacity)
+        learner = ReinforcementLearner(memory_size=capacity)
+        memory = deque(maxlen=capacity)
+        for i in range(capacity):
+            next_state = None if i % 10 == 0 else next_states[i]
+            memory.append((states[i], int(actions[i]), float(rewards[i]), next_state))
+            learner.remember(states[i], actions[i], rewards[i], next_state)
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            _deque_replay(learner, memory, batch_size)
+        deque_rate = steps / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(steps):
+            learner.replay(batch_size)
+        buffer_rate = steps / (time.perf_counter() - start)
+        print(f"{capacity:>9} {deque_rate:>14.0f} {buffer_rate:>15.0f} {buffer_rate / deque_rate:>7.1f}x")
+
+
+def bench_prioritized(steps=4000, capacity=10000, rare=0.01, target=3.0, seeds=3, every=250):
+    """Gradient steps to learn rare failures: uniform vs prioritized replay.
+
+    The memory holds terminal transitions with reward 0, except a `rare`
+    fraction of distinguishable failures with reward -10. The table shows the
+    mean |Q - reward| on failures and on ordinary transitions, averaged over
+    seeds, and the first step at which the failure error fell below `target`.
+    """
+    def train(prioritized, seed):
+        torch.manual_seed(seed)
+        rng = np.random.default_rng(seed)
+        learner = ReinforcementLearner(memory_size=capacity, prioritized=prioritized)
+        learner.memory.rng = np.random.default_rng(seed)
+        states = rng.random((capacity, 8), dtype=np.float32)
+        actions = rng.integers(0, 3, capacity)
+        failed = rng.random(capacity) < rare
+        rewards = np.where(failed, -10.0, 0.0).astype(np.float32)
+        states[failed, 0] += 1
+        for i in range(capacity):
+            learner.remember(states[i], actions[i], rewards[i], None)
+        states_tensor, actions_tensor = torch.from_numpy(states), torch.from_numpy(actions)
+        errors = []
+        for _ in range(steps // every):
+            for _ in range(every):
+                learner.replay()
+            with torch.no_grad():
+                q = learner.model(states_tensor).gather(1, actions_tensor.unsqueeze(1)).squeeze(1).numpy()
+            error = np.abs(q - rewards)
+            errors.append((error[failed].mean(), error[~failed].mean()))
+        return np.array(errors)
+
+    uniform = np.mean([train(False, seed) for seed in range(seeds)], axis=0)
+    prioritized = np.mean([train(True, seed) for seed in range(seeds)], axis=0)
+    print(f"{'steps':>6} {'uniform fail err':>17} {'uniform other err':>18} {'prio fail err':>14} {'prio other err':>15}")
+    for i in range(len(uniform)):
+        print(f"{(i + 1) * every:>6} {uniform[i, 0]:>17.2f} {uniform[i, 1]:>18.2f} "
+              f"{prioritized[i, 0]:>14.2f} {prioritized[i, 1]:>15.2f}")
+    for name, errors in (("uniform", uniform), ("prioritized", prioritized)):
+        reached = np.flatnonzero(errors[:, 0] < target)
+        print(f"{name}: failure error < {target} after "
+              + (f"{(reached[0] + 1) * every} steps" if len(reached) else f"more than {steps} steps"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="aitaskscheduler queue benchmarks")
+    parser.add_argument("benchmark", nargs="?", default="queue", choices=["queue", "dispatch", "decisions", "inference", "metrics", "history", "task-history", "replay", "prioritized"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5, 10**6])
+    parser.add_argument("--cycles", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    args = parser.parse_args()
+    if args.benchmark == "queue":
+        bench_task_queue(args.sizes, args.cycles)
+    elif args.benchmark == "dispatch":
+        bench_dispatch_latency()
+    elif args.benchmark == "decisions":
+        bench_decisions(args.batch_sizes)
+    elif args.benchmark == "inference":
+        bench_inference()
+    elif args.benchmark == "metrics":
+        bench_metrics()
+    elif args.benchmark == "history":
+        bench_history([10**3, 10**4, 10**5])
+    elif args.benchmark == "task-history":
+        bench_task_history([10**3, 10**4, 10**5])
+    elif args.benchmark == "replay":
+        bench_replay([10**4, 10**5, 10**6])
+    elif args.benchmark == "prioritized":
+        bench_prioritized()
@@ -0,0 +1,76 @@
+import random
+from collections import Counter
+
+import pytest
+
+from cfsScheduler import (KERNEL_ACCOUNTING, LEGACY_ACCOUNTING, GroupScheduler, MultiCoreSimulator, Node,
+                          RedBlackTree, SchedStats, replay_workload)
+
+
+def test_set_shares_rejects_root_group():
+    sched = GroupScheduler()
+    with pytest.raises(ValueError, match="root group has no shares"):
+        sched.set_shares('/', 2048)
+
+
+def test_set_shares_splits_cpu_by_new_shares():
+    sched = GroupScheduler()
+    sched.create_group('a')
+    sched.create_group('b')
+    sched.add_task(Node(1, timeToExec=float('inf')), 'a')
+    sched.add_task(Node(2, timeToExec=float('inf')), 'b')
+    sched.run(max_time=300)
+    sched.set_shares('a', 3072)
+    for group in sched.groups.values():
+        group.cpuTime = 0
+    sched.run(max_time=3000)
+    shares = sched.shares()
+    assert shares['a'] == pytest.approx(0.75, abs=0.01)
+    assert shares['b'] == pytest.approx(0.25, abs=0.01)
+
+
+def test_replay_stats_match_per_task_records():
+    rng = random.Random(1)
+    records = []
+    arrival = 0
+    for pid in range(1, 200):
+        arrival += rng.uniform(0, 3)
+        bursts = rng.randint(1, 3)
+        records.append((arrival, pid, rng.randint(0, 5), [rng.uniform(1, 10) for _ in range(bursts)],
+                        [rng.uniform(1, 20) for _ in range(bursts - 1)]))
+    stats = SchedStats()
+    finished = list(replay_workload(records, RedBlackTree(), stats=stats))
+    summary = stats.summary()
+    wait, turnaround = summary['wait'], summary['turnaround']
+    assert wait['mean'] * wait['count'] == pytest.approx(sum(f[4] for f in finished))
+    assert turnaround['mean'] * turnaround['count'] == pytest.approx(sum(f[2] - f[1] for f in finished))
+
+
+def test_balancing_bounds_migrations_per_task_for_mixed_nice():
+    rng = random.Random(0)
+    acc = KERNEL_ACCOUNTING
+    sim = MultiCoreSimulator(cpus=4, accounting=acc, rng=random.Random(0))
+    for pid in range(1, 101):
+        nice = rng.randint(-20, 19)
+        sim.add_task(Node(PID=pid, niceValue=nice, timeToExec=acc.to_time(rng.uniform(10, 20)),
+                          weight=acc.weight(nice)))
+    per_task = Counter()
+    migrate = sim.migrate
+
+    def counting_migrate(node, src, dst):
+        per_task[node.PID] += 1
+        migrate(node, src, dst)
+
+    sim.migrate = counting_migrate
+    summary = sim.run()
+    assert summary['migrations'] == sum(per_task.values())
+    assert summary['migrations'] <= 2 * 100
+    assert max(per_task.values()) <= 5
+
+
+def test_legacy_accounting_rejects_negative_nice():
+    with pytest.raises(ValueError):
+        LEGACY_ACCOUNTING.weight(-1)
+    with pytest.raises(ValueError):
+        RedBlackTree().insert(Node(1, niceValue=-5))
+    assert KERNEL_ACCOUNTING.weight(-5) == 3121